@@ -31,7 +31,8 @@ topics = {
             'order': 'newest_first',
             'price_to': '45',
         },
-        "exclude_catalog_ids": "26,98,146,139,152,1918"
+        "exclude_catalog_ids": "26,98,146,139,152,1918",
+        "scan_interval": 6
     },
 
     "bags 2": {
@@ -45,7 +46,8 @@ topics = {
             'order': 'newest_first',
             'price_to': '45',
         },
-        "exclude_catalog_ids": "26,98,146,139,152,1918"
+        "exclude_catalog_ids": "26,98,146,139,152,1918",
+        "scan_interval": 6
     },
 
     "Alexander Wang Leather Bags": {
@@ -264,4 +266,124 @@ topics = {
 # Для обратной совместимости
 queries = []
 for topic_name, topic_data in topics.items():
-    queries.append(topic_data["query"])
\ No newline at end of file
+    queries.append(topic_data["query"])
+
+# ХРАНИЛИЩЕ ПРОСМОТРЕННЫХ ТОВАРОВ
+# Сколько новых ID копить в append-only хвосте перед слиянием в отсортированный vinted_items.bin
+seen_compact_threshold = 20000
+# Политика хранения (0 / False - критерий отключен):
+# максимум ID, максимальный возраст ID и порог по минимальному ID в последней выдаче каждого топика
+seen_max_entries = 200000
+seen_max_age_hours = 72
+seen_topic_floor = True
+seen_topic_floor_margin = 10000
+# Пакетная запись новых ID: сброс каждые N ID или T мс (что раньше), fsync - надежнее, но медленнее
+# seen_flush_every_items = 1 и seen_flush_interval_ms = 0 - синхронная запись каждого ID
+seen_flush_every_items = 64
+seen_flush_interval_ms = 500
+seen_fsync = False
+
+# SQLite (WAL) хранилище найденных товаров: пакетная запись в фоне
+item_db_path = "vinted_items.db"
+item_db_batch_size = 200
+item_db_flush_interval = 1.0
+
+# ПАРАЛЛЕЛЬНОЕ СКАНИРОВАНИЕ (asyncio-движок)
+# Общий лимит запросов к Vinted в секунду, соединений на хост и потоков для запросов
+max_requests_per_second = 2.0
+max_connections_per_host = 3
+scan_workers = 6
+
+# ПЛАНИРОВЩИК ТОПИКОВ
+# Интервал сканирования топика по умолчанию (в секундах); свой интервал - "scan_interval" в топике
+default_scan_interval = 12
+# Множители интервалов для /fast и /slow
+scan_presets = {"fast": 1.0, "slow": 4.0}
+# Адаптивные интервалы: частые топики сканируются чаще, редкие - реже (в пределах min/max, в секундах)
+# Цель - scan_target_new_per_poll новых товаров за сканирование; частота забывается за scan_rate_half_life_minutes
+scan_adaptive = True
+scan_min_interval = 4
+scan_max_interval = 120
+scan_target_new_per_poll = 0.5
+scan_rate_half_life_minutes = 60
+
+# HTTP ПУЛ СОЕДИНЕНИЙ для запросов к Vinted
+# Число хостов в пуле, соединений на хост, keep-alive и отдельные таймауты подключения/чтения (в секундах)
+http_pool_connections = 4
+http_pool_maxsize = 8
+http_keep_alive = True
+http_connect_timeout = 5
+http_read_timeout = 15
+
+# Кэш cookies Vinted: главная страница запрашивается раз в cookie_ttl_minutes или после ответа 401
+cookie_ttl_minutes = 30
+
+# ОБЪЕДИНЕНИЕ ЗАПРОСОВ ТОПИКОВ: один запрос к каталогу на несколько топиков, раздача товаров локально
+# "off" - без объединения, "price" - только запросы, различающиеся лишь price_to (безопасно),
+# "brand" - еще и объединение брендов при одинаковых каталогах и тексте поиска (нужен brand_id в выдаче)
+# Топики из этого файла различаются не только ценой: в режиме "price" ничего не объединяется,
+# в режиме "brand" 18 запросов сводятся к 9
+query_coalescing = "price"
+
+# Дедупликация одинаковых запросов к каталогу: ответ живет request_cache_ttl секунд (меньше минимального интервала)
+request_cache_ttl = 2.0
+request_cache_size = 256
+
+# Разрывы выдачи: если все товары страницы новые, догружаются следующие страницы (всего не больше gap_max_pages)
+gap_max_pages = 3
+
+# Circuit breaker: максимальная пауза хоста после 429/403/5xx (в секундах), сканер при этом не блокируется
+breaker_max_cooldown = 900
+
+# Исполнитель запросов: попыток на транспорт, общий бюджет времени топика и пауза между повторами (в секундах)
+request_max_attempts = 3
+request_topic_budget = 10
+request_backoff = (1.0, 3.0)
+
+# Очередь уведомлений каждого канала (Telegram, Slack, email); при переполнении новые уведомления отбрасываются
+notify_queue_size = 500
+
+# Лимиты Telegram (token bucket): сообщений в секунду на бота, в личный чат, в минуту на группу,
+# в секунду на тему группы и допустимый всплеск; после 429 соблюдается retry_after
+telegram_global_rate = 25
+telegram_chat_rate = 1
+telegram_group_per_minute = 20
+telegram_thread_rate = 1
+telegram_burst = 3
+
+# Объединение всплесков в Telegram: товары одной темы, найденные в пределах окна (секунды, 0 - выключено),
+# отправляются альбомом sendMediaGroup (до 10 фото); больше порога - одним текстовым дайджестом
+telegram_batch_window = 2.0
+telegram_digest_threshold = 10
+
+# Надежная доставка уведомлений: outbox в SQLite (item_db_path), подтверждение по каждому каналу,
+# повторы через notify_retry_base * 2^попытка секунд (не больше notify_retry_max), после сбоя - доотправка
+notify_outbox = True
+notify_max_attempts = 10
+notify_retry_base = 5
+notify_retry_max = 900
+
+# Email: порт SMTP (587 - STARTTLS), закрытие простаивающего соединения (секунды),
+# окно сбора товаров в одно письмо-дайджест (секунды, 0 - письмо на каждый товар)
+smtp_port = 587
+smtp_idle_timeout = 60
+email_digest_window = 0
+
+# Slack: сообщений в секунду на webhook (лимит Slack ~1) и окно сбора товаров в одно сообщение Block Kit
+# (секунды, 0 - сообщение на каждый товар)
+slack_rate = 1.0
+slack_batch_window = 1.0
+
+# Webhook вместо long polling: публичный HTTPS-адрес бота (пусто - polling), путь, порт
+# (None - переменная окружения PORT или 8443) и secret token (пусто - случайный при каждом запуске)
+telegram_webhook_url = ""
+telegram_webhook_path = "/telegram"
+telegram_webhook_port = None
+telegram_webhook_secret = ""
+
+# /topics: сколько тем проверять одновременно, сколько проверок в секунду (отдельно от лимитов
+# уведомлений) и сколько минут доверять известному состоянию темы
+# (оно обновляется и по результатам обычных отправок уведомлений)
+topic_probe_concurrency = 5
+topic_probe_rate = 5
+topic_probe_ttl_minutes = 60
@@ -48,3 +48,118 @@ queries = [
     },
 
 ]
+
+# Seen-item store: new IDs kept in the append-only tail before merging into the sorted vinted_items.bin
+seen_compact_threshold = 20000
+
+# Seen-item retention (0 / False disables a criterion): max stored IDs, max ID age in hours,
+# and dropping IDs below the lowest ID in each topic's latest results (minus the margin)
+seen_max_entries = 200000
+seen_max_age_hours = 72
+seen_topic_floor = True
+seen_topic_floor_margin = 10000
+
+# Group commit of new seen IDs: flush every N IDs or every T ms, whichever comes first; fsync is safer but slower
+# (seen_flush_every_items = 1 and seen_flush_interval_ms = 0 write every ID synchronously)
+seen_flush_every_items = 64
+seen_flush_interval_ms = 500
+seen_fsync = False
+
+# SQLite (WAL) store of found items, written in the background in batches
+item_db_path = "vinted_items.db"
+item_db_batch_size = 200
+item_db_flush_interval = 1.0
+
+# Concurrent scanning: Vinted requests per second (all topics), connections per host and worker threads
+max_requests_per_second = 2.0
+max_connections_per_host = 3
+scan_workers = 6
+
+# Topic scheduler: default scan interval in seconds (a topic can set its own "scan_interval")
+# and the interval multipliers used by /fast and /slow
+default_scan_interval = 12
+scan_presets = {"fast": 1.0, "slow": 4.0}
+
+# Adaptive intervals (seconds, within min/max): aim for scan_target_new_per_poll new items per scan;
+# the observed rate decays with a half-life of scan_rate_half_life_minutes
+scan_adaptive = True
+scan_min_interval = 4
+scan_max_interval = 120
+scan_target_new_per_poll = 0.5
+scan_rate_half_life_minutes = 60
+
+# Pooled HTTP client for Vinted: pooled hosts, connections per host, keep-alive, connect/read timeouts (seconds)
+http_pool_connections = 4
+http_pool_maxsize = 8
+http_keep_alive = True
+http_connect_timeout = 5
+http_read_timeout = 15
+
+# Vinted cookies are refreshed every cookie_ttl_minutes or after a 401
+cookie_ttl_minutes = 30
+
+# Query coalescing, one catalog request for several topics: "off", "price" (queries that differ
+# only in price_to) or "brand" (also merge brands with equal catalogs and search text).
+# Topics that also differ in brand_ids are merged only in "brand" mode
+query_coalescing = "price"
+
+# Identical catalog requests share one response for request_cache_ttl seconds
+request_cache_ttl = 2.0
+request_cache_size = 256
+
+# When a whole page of results is new, follow-up pages are fetched (at most gap_max_pages in total)
+gap_max_pages = 3
+
+# Circuit breaker: longest pause for a host after 429/403/5xx responses (seconds)
+breaker_max_cooldown = 900
+
+# Request executor: attempts per transport, time budget of a topic scan and backoff range between retries (seconds)
+request_max_attempts = 3
+request_topic_budget = 10
+request_backoff = (1.0, 3.0)
+
+# Queue size of each notification channel; new notifications are dropped when it is full
+notify_queue_size = 500
+
+# Telegram rate limits: messages per second per bot and per private chat, per minute per group,
+# per second per group topic, and the allowed burst
+telegram_global_rate = 25
+telegram_chat_rate = 1
+telegram_group_per_minute = 20
+telegram_thread_rate = 1
+telegram_burst = 3
+
+# Items of one topic found within telegram_batch_window seconds (0 - off) are sent as one album;
+# bursts above telegram_digest_threshold items become one text digest
+telegram_batch_window = 2.0
+telegram_digest_threshold = 10
+
+# Notification outbox in item_db_path: per-channel acknowledgement, retries with exponential backoff
+# from notify_retry_base up to notify_retry_max seconds, at most notify_max_attempts attempts
+notify_outbox = True
+notify_max_attempts = 10
+notify_retry_base = 5
+notify_retry_max = 900
+
+# Email: SMTP port (587 - STARTTLS), idle connection timeout (seconds)
+# and digest window (seconds, 0 - one email per item)
+smtp_port = 587
+smtp_idle_timeout = 60
+email_digest_window = 0
+
+# Slack: messages per second per webhook and window for batching items into one message (seconds, 0 - off)
+slack_rate = 1.0
+slack_batch_window = 1.0
+
+# Telegram webhook instead of polling: public HTTPS URL (empty - polling), path, port
+# (None - PORT environment variable or 8443) and secret token (empty - random on every start)
+telegram_webhook_url = ""
+telegram_webhook_path = "/telegram"
+telegram_webhook_port = None
+telegram_webhook_secret = ""
+
+# /topics: concurrent thread probes, probes per second (separate from notification limits)
+# and how long (minutes) a known thread state is trusted
+topic_probe_concurrency = 5
+topic_probe_rate = 5
+topic_probe_ttl_minutes = 60
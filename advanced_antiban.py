@@ -6,6 +6,7 @@
 """
 
 import asyncio
+import threading
 import time
 import random
 import logging
@@ -14,6 +15,8 @@ import json
 from typing import Dict, List, Optional
 from fake_useragent import UserAgent
 import Config
+from http_client import get_http_client
+from cookie_cache import get_cookie_cache
 
 # Используется только HTTP режим для Railway совместимости
 PLAYWRIGHT_AVAILABLE = False
@@ -23,7 +26,12 @@ class AdvancedAntiBan:
     
     def __init__(self):
         self.ua = UserAgent()
-        self.session = requests.Session()
+        # Сессия со своими cookies поверх общего пула соединений
+        self.http_client = get_http_client()
+        self.session = self.http_client.new_session()
+        self.cookie_cache = get_cookie_cache()
+        # Выбор и ротация прокси из параллельных запросов
+        self._proxy_lock = threading.Lock()
         
         # Настройки системы
         self.max_retries = 3
@@ -546,8 +554,28 @@ class AdvancedAntiBan:
         self.current_delay = 1.0
     
 
-    def make_http_request(self, url: str, params: dict, cookies: dict = None) -> Optional[dict]:
-        """HTTP запрос с антибаном и умной системой прокси"""
+    def _request_timeout(self, deadline: Optional[float]):
+        """(connect, read) таймауты пула, read не дольше оставшегося до deadline времени"""
+        connect_timeout, read_timeout = self.http_client.timeout
+        if deadline is None:
+            return connect_timeout, read_timeout
+        return connect_timeout, max(0.5, min(read_timeout, deadline - time.time()))
+
+    def _proxy_for_request(self, use_proxy: bool) -> Optional[dict]:
+        """Прокси на один запрос: выбор и ротация под lock, proxy_mode не меняется"""
+        if not use_proxy or not self.proxies:
+            return None
+        with self._proxy_lock:
+            if proxy is None or self.proxy_rotation_count >= self.max_requests_per_proxy:
+                self._rotate_proxy()
+            self.proxy_rotation_count += 1
+            return proxy
+
+    def make_http_request(self, url: str, params: dict, cookies: dict = None,
+                          deadline: Optional[float] = None, use_proxy: Optional[bool] = None) -> Optional[dict]:
+        """HTTP запрос с антибаном и умной системой прокси; deadline (time.time()) ограничивает
+        таймауты и повтор после переаутентификации. use_proxy - выбор для этого запроса
+        (None - по proxy_mode); если прокси нужен, но его нет, запрос не отправляется"""
         logging.info(f"🚀 Продвинутая система (ID: {id(self)}): Начинаем HTTP запрос")
         self.http_requests += 1
         self.session_requests += 1
@@ -555,32 +583,19 @@ class AdvancedAntiBan:
         # Проверка здоровья прокси
         self._check_proxy_health()
         
-        # Проверка необходимости ротации прокси (только если используем прокси)
-        if self._should_use_proxy() and self.proxies and (self.proxy_rotation_count >= self.max_requests_per_proxy or 
-            self.current_proxy is None):
-            self._rotate_proxy()
+        # Прокси выбирается на этот запрос - параллельные запросы не меняют друг другу режим
+        if use_proxy is None:
+            use_proxy = self._should_use_proxy()
+        proxy = self._proxy_for_request(use_proxy)
+        if use_proxy and proxy is None:
+            logging.warning(f"⚠️ Прокси нужен, но недоступен - запрос не отправлен")
+            return None
+        session = self.session
         
-        # УЛУЧШЕННАЯ СИСТЕМА ПОЛУЧЕНИЯ COOKIES
+        # COOKIES ИЗ ОБЩЕГО КЭША (тот же путь обновления, что и у базовой системы)
         if cookies is None or not cookies:
-            try:
-                import Config
-                main_url = Config.vinted_url
-                headers = self.get_random_headers()
-                
-                # Сначала получаем основную страницу для cookies
-                logging.info(f"🍪 Получаем новые cookies с {main_url}")
-                main_response = self.session.get(main_url, headers=headers, timeout=30)
-                
-                if main_response.status_code == 200:
-                    cookies = self.session.cookies.get_dict()
-                    logging.info(f"✅ Получены cookies: {cookies}")
-                else:
-                    logging.warning(f"⚠️ Ошибка получения cookies: HTTP {main_response.status_code}")
-                    cookies = {}
-                    
-            except Exception as e:
-                logging.warning(f"⚠️ Ошибка получения cookies: {e}")
-                cookies = {}
+            cookies = self.cookie_cache.get(self.get_random_headers())
+            logging.info(f"🍪 Cookies из общего кэша: {len(cookies)} шт.")
         else:
             logging.info(f"🍪 Используем переданные cookies: {cookies}")
         
@@ -595,49 +610,31 @@ class AdvancedAntiBan:
             logging.info(f"🌐 Продвинутая система: HTTP запрос к {url}")
             logging.info(f"🔧 Профиль: {self.current_profile['name']}")
             
-            # УМНАЯ САМОВОССТАНАВЛИВАЮЩАЯСЯ СИСТЕМА ПРОКСИ
-            if self._should_use_proxy():
-                # Если нужно использовать прокси, но его нет - включаем
-                if not self.current_proxy and self.proxies:
-                    logging.info(f"🔄 АВТОМАТИЧЕСКОЕ ВКЛЮЧЕНИЕ ПРОКСИ (ошибок: {self.errors_403 + self.errors_429 + self.errors_521})")
-                    self.proxy_mode = "enabled"
-                    self._rotate_proxy()
-                # Если прокси нужен и режим auto - переключаемся на enabled
-                elif self.proxy_mode == "auto" and self.current_proxy:
-                    logging.info(f"🔄 ПЕРЕКЛЮЧЕНИЕ РЕЖИМА: auto -> enabled (ошибок: {self.errors_403 + self.errors_429 + self.errors_521})")
-                    self.proxy_mode = "enabled"
-                
-                if self.current_proxy:
-                    logging.info(f"🔧 Прокси: {self.current_proxy['host']}:{self.current_proxy['port']} (режим: {self.proxy_mode})")
-                    proxy_dict = {
-                        'http': self.current_proxy['http'],
-                        'https': self.current_proxy['https']
-                    }
-                    # Обновляем статистику прокси
-                    self.current_proxy['requests'] += 1
-                    self.proxy_rotation_count += 1
-                    self.proxy_requests += 1  # НОВАЯ СТАТИСТИКА
-                else:
-                    logging.warning(f"⚠️ Прокси нужен, но недоступен (режим: {self.proxy_mode})")
-                    proxy_dict = None
-                    self.proxy_rotation_count += 1
-                    self.no_proxy_requests += 1  # НОВАЯ СТАТИСТИКА
+            if proxy:
+                logging.info(f"🔧 Прокси: {proxy['host']}:{proxy['port']} (режим: {self.proxy_mode})")
+                proxy_dict = {
+                    'http': proxy['http'],
+                    'https': proxy['https']
+                }
+                # Обновляем статистику прокси
+                proxy['requests'] += 1
+                self.proxy_requests += 1  # НОВАЯ СТАТИСТИКА
             else:
                 logging.info(f"🔧 Прокси: ❌ Отключен (режим: {self.proxy_mode})")
                 proxy_dict = None
-                self.proxy_rotation_count += 1
                 self.no_proxy_requests += 1  # НОВАЯ СТАТИСТИКА
             
             logging.info(f"🔧 Параметры: {params}")
             logging.info(f"🍪 Cookies: {cookies}")
             
-            response = self.session.get(
+            response = self.http_client.get(
                 url,
+                session=session,
                 params=params,
                 headers=headers,
                 proxies=proxy_dict,
-                timeout=30,
-                cookies=cookies
+                cookies=cookies,
+                timeout=self._request_timeout(deadline)
             )
             
             logging.info(f"📝 Ответ: {response.text[:200]}")
@@ -647,37 +644,38 @@ class AdvancedAntiBan:
             if response.status_code == 401:
                 logging.warning(f"🚫 HTTP 401 - Недействительный токен аутентификации")
                 self.consecutive_errors += 1
-                if self.current_proxy:
-                    self.current_proxy['errors'] += 1
-                    self._update_proxy_health(self.current_proxy, False)
+                if proxy:
+                    proxy['errors'] += 1
+                    self._update_proxy_health(proxy, False)
                 
-                # Попытка переаутентификации
+                # Попытка переаутентификации через общий кэш cookies
                 try:
                     logging.info(f"🔄 Попытка переаутентификации...")
-                    import Config
-                    main_url = Config.vinted_url
                     
                     # Очищаем старые cookies
-                    self.session.cookies.clear()
+                    session.cookies.clear()
+                    self.cookie_cache.invalidate(cookies)
                     
                     # Получаем новые cookies
-                    main_response = self.session.get(main_url, headers=headers, timeout=30)
-                    if main_response.status_code == 200:
-                        new_cookies = self.session.cookies.get_dict()
+                    new_cookies = self.cookie_cache.get(headers)
+                    if deadline is not None and time.time() >= deadline:
+                        logging.warning(f"⏳ Бюджет запроса исчерпан - повтор после переаутентификации пропущен")
+                    elif new_cookies and new_cookies != cookies:
                         logging.info(f"✅ Новые cookies получены: {new_cookies}")
                         
                         # Повторяем запрос с новыми cookies
-                        response = self.session.get(
+                        response = self.http_client.get(
                             url,
+                            session=session,
                             params=params,
                             headers=headers,
                             proxies=proxy_dict,
-                            timeout=30,
-                            cookies=new_cookies
+                            cookies=new_cookies,
+                            timeout=self._request_timeout(deadline)
                         )
                         logging.info(f"🔄 Повторный запрос: HTTP {response.status_code}")
                     else:
-                        logging.error(f"❌ Не удалось получить новые cookies: HTTP {main_response.status_code}")
+                        logging.error(f"❌ Не удалось получить новые cookies")
                         
                 except Exception as e:
                     logging.error(f"❌ Ошибка переаутентификации: {e}")
@@ -688,11 +686,11 @@ class AdvancedAntiBan:
             # Обработка ответа
             if response.status_code == 200:
                 self.http_success += 1
-                if self.current_proxy:
-                    self.current_proxy['success'] += 1
+                if proxy:
+                    proxy['success'] += 1
                     self.proxy_successes += 1
                     self.proxy_success += 1  # Счетчик успешных запросов с прокси
-                    self._update_proxy_health(self.current_proxy, True)
+                    self._update_proxy_health(proxy, True)
                 else:
                     self.no_proxy_success += 1  # Счетчик успешных запросов без прокси
                 self.reset_backoff()
@@ -715,43 +713,44 @@ class AdvancedAntiBan:
             elif response.status_code == 403:
                 self.errors_403 += 1
                 self.consecutive_errors += 1
-                if self.current_proxy:
-                    self.current_proxy['errors'] += 1
+                if proxy:
+                    proxy['errors'] += 1
                     self.proxy_failures += 1
-                    self._update_proxy_health(self.current_proxy, False)
+                    self._update_proxy_health(proxy, False)
                 logging.warning(f"🚫 HTTP 403 Forbidden (ошибок подряд: {self.consecutive_errors})")
                 
             elif response.status_code == 429:
                 self.errors_429 += 1
                 self.consecutive_errors += 1
-                if self.current_proxy:
-                    self.current_proxy['errors'] += 1
+                if proxy:
+                    proxy['errors'] += 1
                     self.proxy_failures += 1
-                    self._update_proxy_health(self.current_proxy, False)
+                    self._update_proxy_health(proxy, False)
                 logging.warning(f"⏱️ HTTP 429 Too Many Requests")
                 
             elif response.status_code == 521:
                 self.errors_521 += 1
                 self.consecutive_errors += 1
-                if self.current_proxy:
-                    self.current_proxy['errors'] += 1
+                if proxy:
+                    proxy['errors'] += 1
                     self.proxy_failures += 1
-                    self._update_proxy_health(self.current_proxy, False)
+                    self._update_proxy_health(proxy, False)
                 logging.warning(f"🔧 HTTP 521 Server Down")
                 
             else:
                 # Обработка других ошибок (401, 500, etc.)
                 self.consecutive_errors += 1
-                if self.current_proxy:
-                    self.current_proxy['errors'] += 1
+                if proxy:
+                    proxy['errors'] += 1
                     self.proxy_failures += 1
-                    self._update_proxy_health(self.current_proxy, False)
+                    self._update_proxy_health(proxy, False)
                 logging.warning(f"⚠️ HTTP {response.status_code}: {response.text[:100]}")
                 
             # При множественных ошибках - ротация прокси или отключение
             if self.consecutive_errors >= 3:
-                if self._should_use_proxy() and self.proxies:
-                    self._rotate_proxy()
+                if proxy:
+                    with self._proxy_lock:
+                        self._rotate_proxy()
                 self.refresh_session()
                 
             return None
@@ -759,34 +758,34 @@ class AdvancedAntiBan:
         except Exception as e:
             logging.error(f"❌ HTTP ошибка: {e}")
             self.consecutive_errors += 1
-            if self.current_proxy:
-                self.current_proxy['errors'] += 1
+            if proxy:
+                proxy['errors'] += 1
                 self.proxy_failures += 1
-                self._update_proxy_health(self.current_proxy, False)
+                self._update_proxy_health(proxy, False)
             return None
     
     def _update_proxy_health(self, proxy, success: bool):
         """Обновление здоровья прокси"""
-        if success:
-            # Увеличиваем здоровье при успехе
-            proxy['health_score'] = min(100, proxy['health_score'] + 10)
-            if proxy['health_score'] >= 80 and proxy not in self.proxy_whitelist:
-                self.proxy_whitelist.append(proxy)
-                logging.info(f"✅ Прокси {proxy['host']}:{proxy['port']} добавлен в whitelist")
-        else:
-            # Уменьшаем здоровье при ошибке
-            proxy['health_score'] = max(0, proxy['health_score'] - 20)
-            if proxy['health_score'] <= 20 and proxy in self.proxy_whitelist:
-                self.proxy_whitelist.remove(proxy)
-                logging.warning(f"❌ Прокси {proxy['host']}:{proxy['port']} удален из whitelist")
-            elif proxy['health_score'] <= 0:
-                self.proxy_blacklist.append(proxy)
-                logging.error(f"🚫 Прокси {proxy['host']}:{proxy['port']} добавлен в blacklist")
+        with self._proxy_lock:
+            if success:
+                # Увеличиваем здоровье при успехе
+                proxy['health_score'] = min(100, proxy['health_score'] + 10)
+                if proxy['health_score'] >= 80 and proxy not in self.proxy_whitelist:
+                    self.proxy_whitelist.append(proxy)
+                    logging.info(f"✅ Прокси {proxy['host']}:{proxy['port']} добавлен в whitelist")
+            else:
+                # Уменьшаем здоровье при ошибке
+                proxy['health_score'] = max(0, proxy['health_score'] - 20)
+                if proxy['health_score'] <= 20 and proxy in self.proxy_whitelist:
+                    self.proxy_whitelist.remove(proxy)
+                    logging.warning(f"❌ Прокси {proxy['host']}:{proxy['port']} удален из whitelist")
+                elif proxy['health_score'] <= 0:
+                    self.proxy_blacklist.append(proxy)
+                    logging.error(f"🚫 Прокси {proxy['host']}:{proxy['port']} добавлен в blacklist")
 
     def refresh_session(self):
-        """Обновление HTTP сессии"""
-        self.session.close()
-        self.session = requests.Session()
+        """Обновление HTTP сессии (новые cookies, соединения пула сохраняются)"""
+        self.session = self.http_client.new_session()
         self.session_cookies = {}
         self.session_created = time.time()
         self.session_requests = 0
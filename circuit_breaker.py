@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Circuit breaker по хостам
+Вместо сна в потоке сканера при 429/403/503 хост "остывает": запросы к нему не отправляются
+до retry_at, затем один пробный запрос (half-open) решает, закрыть цепь или снова открыть
+"""
+
+import email.utils
+import logging
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlparse
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def parse_retry_after(value) -> Optional[float]:
+    """Заголовок Retry-After (секунды или HTTP-дата) -> секунды ожидания"""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(str(value))
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+class CircuitBreaker:
+    """Состояния closed -> open (до retry_at) -> half_open (один пробный запрос) -> closed/open"""
+
+    def __init__(self, name: str, max_cooldown: float = 900.0):
+        self.name = name
+        self.max_cooldown = max_cooldown
+        self._state = CLOSED
+        self._state_since = time.time()
+        self._retry_at = 0.0
+        self._probe_in_flight = False
+        self._generation = 0  # растет при каждом открытии цепи
+        self._lock = threading.Lock()
+
+        # Статистика
+        self.opens = 0
+        self.rejected = 0
+        self.probes = 0
+        self.last_reason = ""
+
+    def _set_state(self, state: str):
+        if state != self._state:
+            self._state = state
+            self._state_since = time.time()
+            logging.info(f"🔌 [{self.name}] Цепь: {state}")
+
+    def _update(self):
+        if self._state == OPEN and time.time() >= self._retry_at:
+            self._set_state(HALF_OPEN)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._update()
+            return self._state
+
+    def allow(self) -> Optional[tuple]:
+        """Можно ли отправить запрос: None - нельзя, иначе пропуск (пробный ли, поколение цепи)
+        для record_success/release; в half_open пропускается только один пробный"""
+        with self._lock:
+            self._update()
+            if self._state == CLOSED:
+                return False, self._generation
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                self.probes += 1
+                return True, self._generation
+            self.rejected += 1
+            return None
+
+    def slots(self) -> Optional[int]:
+        """Сколько запросов можно начать: None - без ограничений, 0 - ни одного, 1 - пробный"""
+        with self._lock:
+            self._update()
+            if self._state == CLOSED:
+                return None
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                return 1
+            return 0
+
+    def retry_in(self) -> float:
+        """Секунд до пробного запроса (0 - цепь не открыта)"""
+        with self._lock:
+            self._update()
+            return max(0.0, self._retry_at - time.time()) if self._state == OPEN else 0.0
+
+    def trip(self, cooldown: float, reason: str = ""):
+        """Открыть цепь на cooldown секунд"""
+        cooldown = min(max(0.0, cooldown), self.max_cooldown)
+        with self._lock:
+            self._retry_at = max(self._retry_at, time.time() + cooldown)
+            self._probe_in_flight = False
+            self._generation += 1
+            if self._state != OPEN:
+                self.opens += 1
+            self._set_state(OPEN)
+            self.last_reason = reason
+        logging.warning(f"⛔ [{self.name}] {reason}: пауза {cooldown:.0f}s без блокировки сканера")
+
+    def _is_current_probe(self, admission: Optional[tuple]) -> bool:
+        return admission is not None and admission[0] and admission[1] == self._generation
+
+    def record_success(self, admission: Optional[tuple]):
+        """Успешный ответ на пробный запрос закрывает цепь; ответы на обычные запросы
+        и на запросы, начатые до открытия, не в счет"""
+        with self._lock:
+            self._update()
+            if self._state == HALF_OPEN and self._is_current_probe(admission):
+                self._probe_in_flight = False
+                self._set_state(CLOSED)
+
+    def release(self, admission: Optional[tuple]):
+        """Пробный запрос завершился без ответа о блокировке и без успеха - разрешить следующий пробный"""
+        with self._lock:
+            if self._is_current_probe(admission):
+                self._probe_in_flight = False
+
+    def get_stats(self):
+        with self._lock:
+            self._update()
+            return {
+                'state': self._state,
+                'time_in_state': time.time() - self._state_since,
+                'retry_in': max(0.0, self._retry_at - time.time()) if self._state == OPEN else 0.0,
+                'opens': self.opens,
+                'rejected': self.rejected,
+                'probes': self.probes,
+                'last_reason': self.last_reason,
+            }
+
+
+class HostBreakers:
+    """Отдельная цепь на каждый хост"""
+
+    def __init__(self, max_cooldown: float = 900.0):
+        self.max_cooldown = max_cooldown
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> CircuitBreaker:
+        host = urlparse(url).netloc or url
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = CircuitBreaker(host, self.max_cooldown)
+                self._breakers[host] = breaker
+            return breaker
+
+    def get_stats(self):
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {host: breaker.get_stats() for host, breaker in breakers.items()}
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Кэш cookies Vinted с TTL
+Главная страница запрашивается только когда cookies истекли или сервер ответил 401,
+а не перед каждым циклом сканирования
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from http_client import get_http_client
+
+
+class CookieCache:
+    """Общие cookies для базовой и продвинутой систем с единым путем обновления"""
+
+    def __init__(self, url: str, ttl: float = 1800.0, retry_after: float = 30.0, http_client=None, budget=None):
+        self.url = url
+        self.ttl = ttl
+        self.retry_after = retry_after  # после неудачного обновления - не чаще, чем раз в retry_after
+        self.http_client = http_client or get_http_client()
+        # Общий бюджет запросов (TokenBucket сканера): обновление cookies - такой же запрос к Vinted.
+        # Только токен, без слота соединения: обновление может идти изнутри уже занятого слота (401)
+        self.budget = budget
+        self._cookies = {}
+        self._expires = 0.0
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+
+        # Статистика
+        self.hits = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.invalidations = 0
+        self.started = time.time()
+
+    def get(self, headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """Актуальные cookies; при истечении обновляет их (одним потоком, остальные ждут)"""
+        with self._lock:
+            if time.time() < self._expires:
+                self.hits += 1
+                return self._cookies
+            return self._refresh(headers)
+
+    def invalidate(self, cookies: Optional[Dict[str, str]] = None):
+        """Сброс после 401; если передан устаревший набор, а cookies уже обновлены - ничего не делаем"""
+        with self._lock:
+            if cookies is not None and cookies is not self._cookies and cookies != self._cookies:
+                return
+            self._expires = 0.0
+            self.invalidations += 1
+        logging.info("🍪 Cookies сброшены (401)")
+
+    def _refresh(self, headers: Optional[Dict[str, str]]) -> Dict[str, str]:
+        now = time.time()
+        session = self.http_client.new_session()
+        try:
+            if self.budget is not None:
+                self.budget.acquire()
+            response = self.http_client.get(self.url, session=session, headers=headers)
+            if response.status_code != 200:
+                raise RuntimeError(f"HTTP {response.status_code}")
+            self._cookies = session.cookies.get_dict()
+            self._expires = now + self.ttl
+            self._refreshed_at = now
+            self.refreshes += 1
+            logging.info(f"🍪 Cookies обновлены ({len(self._cookies)} шт.), следующее обновление через {self.ttl/60:.0f} мин")
+        except Exception as e:
+            self.refresh_errors += 1
+            self._expires = now + self.retry_after
+            logging.warning(f"⚠️ Ошибка получения cookies: {e}")
+        return self._cookies
+
+    def get_stats(self):
+        hours = max((time.time() - self.started) / 3600, 1e-9)
+        return {
+            'hits': self.hits,
+            'refreshes': self.refreshes,
+            'refresh_errors': self.refresh_errors,
+            'invalidations': self.invalidations,
+            'age': time.time() - self._refreshed_at if self._refreshed_at else None,
+            'saved_per_hour': self.hits / hours,
+        }
+
+
+# Глобальный экземпляр (синглтон)
+_cookie_cache_instance = None
+
+
+def get_cookie_cache(budget=None) -> CookieCache:
+    """Получение общего кэша cookies (настройки из Config); budget - общий лимит запросов сканера"""
+    global _cookie_cache_instance
+    if _cookie_cache_instance is None:
+        import Config
+        _cookie_cache_instance = CookieCache(
+            Config.vinted_url,
+            ttl=getattr(Config, "cookie_ttl_minutes", 30) * 60,
+        )
+    if budget is not None:
+        _cookie_cache_instance.budget = budget
+    return _cookie_cache_instance
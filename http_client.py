@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Общий HTTP-клиент с пулом соединений
+Keep-alive соединения переиспользуются между запросами - без нового TCP+TLS рукопожатия на каждый запрос
+"""
+
+import logging
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class PooledHTTPClient:
+    """Пул соединений urllib3, общий для всех сессий (у каждой сессии свои cookies)"""
+
+    def __init__(self, pool_connections: int = 4, pool_maxsize: int = 8, keep_alive: bool = True,
+                 connect_timeout: float = 5.0, read_timeout: float = 15.0):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.keep_alive = keep_alive
+        self.timeout = (connect_timeout, read_timeout)
+        self.adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                   max_retries=0)
+        self.session = self.new_session()
+        self._lock = threading.Lock()
+
+        # Статистика
+        self.requests = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.last_latency = 0.0
+
+    def new_session(self) -> requests.Session:
+        """Новая сессия (чистые cookies) поверх общего пула соединений"""
+        session = requests.Session()
+        session.mount("https://", self.adapter)
+        session.mount("http://", self.adapter)
+        if not self.keep_alive:
+            session.headers["Connection"] = "close"
+        return session
+
+    def request(self, method: str, url: str, session: requests.Session = None, **kwargs) -> requests.Response:
+        """Запрос через пул; таймауты (connect, read) по умолчанию из настроек клиента"""
+        kwargs.setdefault("timeout", self.timeout)
+        started = time.time()
+        try:
+            return (session or self.session).request(method, url, **kwargs)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            latency = time.time() - started
+            with self._lock:
+                self.requests += 1
+                self.total_latency += latency
+                self.last_latency = latency
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def _pools(self):
+        managers = [self.adapter.poolmanager] + list(self.adapter.proxy_manager.values())
+        for manager in managers:
+            for key in list(manager.pools.keys()):
+                pool = manager.pools.get(key)
+                if pool is not None:
+                    yield pool
+
+    def get_stats(self):
+        connections = 0
+        pooled_requests = 0
+        for pool in self._pools():
+            connections += pool.num_connections
+            pooled_requests += pool.num_requests
+        reused = max(0, pooled_requests - connections)
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'connections_opened': connections,
+            'connections_reused': reused,
+            'reuse_rate': reused / pooled_requests if pooled_requests else 0.0,
+            'avg_latency': self.total_latency / self.requests if self.requests else 0.0,
+            'last_latency': self.last_latency,
+            'pool_maxsize': self.pool_maxsize,
+            'timeout': self.timeout,
+        }
+
+    def close(self):
+        """Закрытие всех соединений пула"""
+        try:
+            self.adapter.close()
+        except Exception as e:
+            logging.error(f"❌ Ошибка закрытия пула соединений: {e}")
+
+
+# Глобальный экземпляр (синглтон)
+_http_client_instance = None
+
+
+def get_http_client() -> PooledHTTPClient:
+    """Получение общего HTTP-клиента (настройки из Config)"""
+    global _http_client_instance
+    if _http_client_instance is None:
+        import Config
+        _http_client_instance = PooledHTTPClient(
+            pool_connections=getattr(Config, "http_pool_connections", 4),
+            pool_maxsize=getattr(Config, "http_pool_maxsize", 8),
+            keep_alive=getattr(Config, "http_keep_alive", True),
+            connect_timeout=getattr(Config, "http_connect_timeout", 5),
+            read_timeout=getattr(Config, "http_read_timeout", 15),
+        )
+        logging.info(f"🔌 HTTP пул соединений: {_http_client_instance.pool_maxsize} на хост")
+    return _http_client_instance
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+SQLite (WAL) хранилище найденных товаров
+Запись идет пакетными транзакциями в фоновом потоке и не блокирует сканер
+"""
+
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, List
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    item_id     INTEGER PRIMARY KEY,
+    topic       TEXT NOT NULL,
+    thread_id   INTEGER,
+    title       TEXT,
+    price       REAL,
+    currency    TEXT,
+    size        TEXT,
+    brand       TEXT,
+    catalog_id  INTEGER,
+    url         TEXT,
+    photo_url   TEXT,
+    first_seen  REAL NOT NULL,
+    notified_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_items_topic_first_seen ON items(topic, first_seen);
+CREATE INDEX IF NOT EXISTS idx_items_first_seen ON items(first_seen);
+CREATE INDEX IF NOT EXISTS idx_items_price ON items(price);
+"""
+
+INSERT_SQL = """
+INSERT OR IGNORE INTO items
+    (item_id, topic, thread_id, title, price, currency, size, brand, catalog_id, url, photo_url, first_seen, notified_at)
+VALUES
+    (:item_id, :topic, :thread_id, :title, :price, :currency, :size, :brand, :catalog_id, :url, :photo_url, :first_seen, :notified_at)
+"""
+
+# Время первой успешной доставки уведомления (последующие каналы его не меняют)
+NOTIFIED_SQL = """
+UPDATE items SET notified_at = :notified_at WHERE item_id = :item_id AND notified_at IS NULL
+"""
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """Соединение с WAL и synchronous=NORMAL (быстрые коммиты, устойчивость к сбою процесса)"""
+    conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def item_record(item: dict, topic_name: str, thread_id=None, notified_at=None) -> dict:
+    """Строка для таблицы items из товара в формате API Vinted"""
+    price = item.get("price") or {}
+    try:
+        amount = float(price.get("amount"))
+    except (TypeError, ValueError):
+        amount = None
+    return {
+        'item_id': int(item["id"]),
+        'topic': topic_name,
+        'thread_id': thread_id,
+        'title': item.get("title"),
+        'price': amount,
+        'currency': price.get("currency_code"),
+        'size': item.get("size_title"),
+        'brand': item.get("brand_title"),
+        'catalog_id': item.get("catalog_id"),
+        'url': item.get("url"),
+        'photo_url': (item.get("photo") or {}).get("full_size_url"),
+        'first_seen': time.time(),
+        'notified_at': notified_at,
+    }
+
+
+class ItemStore:
+    """Хранилище товаров: неблокирующая запись через очередь, чтение отдельными соединениями"""
+
+    def __init__(self, path: str = "vinted_items.db", batch_size: int = 200,
+                 flush_interval: float = 1.0, max_queue: int = 10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._running = False
+        self._local = threading.local()
+
+        # Статистика
+        self.inserted = 0
+        self.batches = 0
+        self.dropped = 0
+        self.write_errors = 0
+        self.last_batch_ms = 0.0
+        self.total_batch_ms = 0.0
+
+    def start(self):
+        """Создание схемы и запуск фонового писателя"""
+        if self._running:
+            return
+        try:
+            conn = connect(self.path)
+            conn.executescript(SCHEMA)
+            conn.close()
+        except Exception as e:
+            logging.error(f"❌ Ошибка инициализации {self.path}: {e}")
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True, name="item-store")
+        self._thread.start()
+        logging.info(f"🗄️ SQLite хранилище товаров запущено: {self.path}")
+
+    def record(self, record: dict) -> bool:
+        """Постановка записи в очередь (не блокирует сканер)"""
+        if not self._running:
+            return False
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _run(self):
+        conn = connect(self.path)
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                if not self._running:
+                    break
+                continue
+            if first is None:
+                break
+
+            batch = [first]
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is None:
+                    stop = True
+                    break
+                batch.append(record)
+
+            self._write_batch(conn, batch)
+            if stop:
+                break
+        conn.close()
+
+    def mark_notified(self, item_id, notified_at: float = None) -> bool:
+        """Отметка доставки уведомления; идет через ту же очередь, что и запись товара (после нее)"""
+        return self.record({
+            'op': 'notified',
+            'item_id': int(item_id),
+            'notified_at': notified_at or time.time(),
+        })
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: List[dict]):
+        started = time.time()
+        inserts = [record for record in batch if record.get('op') != 'notified']
+        notified = [record for record in batch if record.get('op') == 'notified']
+        try:
+            with conn:
+                conn.executemany(INSERT_SQL, inserts)
+                conn.executemany(NOTIFIED_SQL, notified)
+            self.inserted += len(inserts)
+            self.batches += 1
+        except Exception as e:
+            self.write_errors += 1
+            logging.error(f"❌ Ошибка записи в {self.path}: {e}")
+        self.last_batch_ms = (time.time() - started) * 1000
+        self.total_batch_ms += self.last_batch_ms
+
+    def close(self):
+        """Остановка писателя с записью всего, что осталось в очереди"""
+        if not self._running:
+            return
+        self._running = False
+        try:
+            self._queue.put(None, timeout=5)
+        except queue.Full:
+            pass
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    # ЧТЕНИЕ (для аналитики и команд бота)
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect(self.path)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def count_by_topic(self, since: float = 0) -> Dict[str, int]:
+        rows = self._reader().execute(
+            "SELECT topic, COUNT(*) FROM items WHERE first_seen >= ? GROUP BY topic", (since,))
+        return {topic: count for topic, count in rows}
+
+    def get_stats(self):
+        return {
+            'inserted': self.inserted,
+            'batches': self.batches,
+            'queued': self._queue.qsize(),
+            'dropped': self.dropped,
+            'write_errors': self.write_errors,
+            'last_batch_ms': self.last_batch_ms,
+            'avg_batch_ms': self.total_batch_ms / self.batches if self.batches else 0.0,
+        }
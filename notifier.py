@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Диспетчер уведомлений
+Сканер только ставит уведомление в очередь; доставка в каждый канал (Telegram, Slack, email)
+идет в своем потоке со своей ограниченной очередью; канал может собирать всплески в пачки.
+С outbox каждая доставка подтверждается по (товар, канал), неудачи повторяются из SQLite
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class NotificationSink:
+    """Канал доставки: ограниченная очередь и рабочий поток"""
+
+    def __init__(self, name: str, send: Callable[[dict], bool], max_queue: int = 500,
+                 send_batch: Optional[Callable[[List[dict]], List[bool]]] = None, batch_window: float = 0.0,
+                 batch_key: Callable[[dict], object] = lambda notification: None):
+        self.name = name
+        self.send = send
+        self.send_batch = send_batch
+        self.batch_window = batch_window if send_batch else 0.0
+        self.batch_key = batch_key
+        self.on_result = None  # on_result(notifications, ok, error) - подтверждение доставки
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+
+        # Статистика
+        self.batches = 0
+        self.batched = 0
+        self.max_batch = 0
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.last_latency = 0.0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True, name=f"notify-{self.name}")
+            self._thread.start()
+
+    def put(self, notification: dict) -> bool:
+        try:
+            self._queue.put_nowait(notification)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            logging.warning(f"⚠️ [{self.name}] Очередь уведомлений переполнена, уведомление отброшено")
+            return False
+
+    def _run(self):
+        while True:
+            notification = self._queue.get()
+            if notification is None:
+                break
+            if not self.batch_window:
+                self._deliver([notification])
+                continue
+            stop = self._deliver_window(notification)
+            if stop:
+                break
+
+    def _deliver_window(self, first: dict) -> bool:
+        """Сбор уведомлений за batch_window и отправка пачками по batch_key; True - получен сигнал остановки"""
+        groups = {}
+        groups.setdefault(self.batch_key(first), []).append(first)
+        deadline = time.time() + self.batch_window
+        stop = False
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                notification = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if notification is None:
+                stop = True
+                break
+            groups.setdefault(self.batch_key(notification), []).append(notification)
+        for group in groups.values():
+            self._deliver(group)
+        return stop
+
+    def _deliver(self, notifications: List[dict]):
+        error = ""
+        try:
+            if len(notifications) == 1:
+                results = [bool(self.send(notifications[0]))]
+            else:
+                # send_batch подтверждает каждое уведомление отдельно
+                results = [bool(ok) for ok in self.send_batch(notifications)]
+                if len(results) != len(notifications):
+                    raise ValueError(f"send_batch вернул {len(results)} результатов на {len(notifications)} уведомлений")
+        except Exception as e:
+            logging.error(f"❌ [{self.name}] Ошибка отправки: {e}")
+            results, error = [False] * len(notifications), str(e)
+        if len(notifications) > 1:
+            self.batches += 1
+            self.batched += len(notifications)
+            self.max_batch = max(self.max_batch, len(notifications))
+        delivered = [n for n, ok in zip(notifications, results) if ok]
+        failed = [n for n, ok in zip(notifications, results) if not ok]
+        if self.on_result:
+            try:
+                if delivered:
+                    self.on_result(delivered, True, "")
+                if failed:
+                    self.on_result(failed, False, error or "отправка не удалась")
+            except Exception as e:
+                logging.error(f"❌ [{self.name}] Ошибка подтверждения доставки: {e}")
+        self.sent += len(delivered)
+        self.failed += len(failed)
+        if failed:
+            logging.warning(f"⚠️ Failed to send to {self.name}: {', '.join(str(n.get('title')) for n in failed)}")
+        # Задержка от обнаружения товара до завершения отправки
+        now = time.time()
+        for notification in notifications:
+            latency = now - notification['enqueued_at']
+            self.last_latency = latency
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def close(self, timeout: float = 10.0):
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def get_stats(self):
+        delivered = self.sent + self.failed
+        return {
+            'depth': self._queue.qsize(),
+            'sent': self.sent,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'batches': self.batches,
+            'batched': self.batched,
+            'max_batch': self.max_batch,
+            'avg_latency': self.total_latency / delivered if delivered else 0.0,
+            'max_latency': self.max_latency,
+            'last_latency': self.last_latency,
+        }
+
+
+class NotificationDispatcher:
+    """Раздача уведомлений о новых товарах во все каналы, не блокируя сканер"""
+
+    def __init__(self, max_queue: int = 500, outbox=None, retry_interval: float = 5.0,
+                 on_delivered: Optional[Callable[[dict, str], None]] = None):
+        self.max_queue = max_queue
+        self.outbox = outbox
+        self.on_delivered = on_delivered  # on_delivered(notification, канал) - после успешной доставки
+        self.retry_interval = retry_interval
+        self.sinks: Dict[str, NotificationSink] = {}
+        # (item_id, канал) в очереди канала или в отправке - retry-цикл не выдает их повторно
+        self._in_flight = set()
+        self._in_flight_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._retry_thread = None
+
+    def add_sink(self, name: str, send: Callable[[dict], bool], **batching):
+        """batching: send_batch, batch_window, batch_key - сбор всплесков в пачки (см. NotificationSink)"""
+        sink = NotificationSink(name, send, self.max_queue, **batching)
+        sink.on_result = lambda notifications, ok, error: self._on_result(name, notifications, ok, error)
+        self.sinks[name] = sink
+
+    def _put(self, sink_name: str, notification: dict) -> bool:
+        key = (str(notification['item_id']), sink_name)
+        with self._in_flight_lock:
+            self._in_flight.add(key)
+        if self.sinks[sink_name].put(notification):
+            return True
+        with self._in_flight_lock:
+            self._in_flight.discard(key)
+        return False
+
+    def _on_result(self, sink_name: str, notifications: List[dict], ok: bool, error: str):
+        for notification in notifications:
+            with self._in_flight_lock:
+                self._in_flight.discard((str(notification['item_id']), sink_name))
+            if ok and self.on_delivered:
+                self.on_delivered(notification, sink_name)
+            if self.outbox is None:
+                continue
+            if ok:
+                self.outbox.ack(notification['item_id'], sink_name)
+            else:
+                self.outbox.fail(notification['item_id'], sink_name, error)
+
+    def start(self):
+        for sink in self.sinks.values():
+            sink.start()
+        if self.sinks:
+            logging.info(f"📬 Диспетчер уведомлений запущен: {', '.join(self.sinks)}")
+        if self.outbox is not None and self.sinks and self._retry_thread is None:
+            self._stop.clear()
+            self._retry_thread = threading.Thread(target=self._retry_loop, daemon=True, name="notify-retry")
+            self._retry_thread.start()
+
+    def _retry_loop(self):
+        """Повторы и доставка после перезапуска: строки outbox, которым пора на отправку"""
+        while True:
+            try:
+                with self._in_flight_lock:
+                    in_flight = set(self._in_flight)
+                for sink_name, notification in self.outbox.claim_due(self.sinks, in_flight=in_flight):
+                    self._put(sink_name, dict(notification, enqueued_at=time.time()))
+            except Exception as e:
+                logging.error(f"❌ Ошибка чтения outbox: {e}")
+            if self._stop.wait(self.retry_interval):
+                break
+
+    def dispatch(self, notification: dict) -> int:
+        """Постановка уведомления во все каналы; возвращает число принявших каналов.
+        С outbox уведомление сначала записывается на диск, уже записанное повторно не ставится"""
+        sink_names = list(self.sinks)
+        if self.outbox is not None:
+            sink_names = self.outbox.add(notification, sink_names)
+        notification = dict(notification, enqueued_at=time.time())
+        return sum(1 for name in sink_names if self._put(name, notification))
+
+    def close(self, timeout: float = 10.0):
+        """Остановка каналов с доставкой того, что уже в очередях"""
+        self._stop.set()
+        if self._retry_thread is not None:
+            self._retry_thread.join(timeout=timeout)
+            self._retry_thread = None
+        for sink in self.sinks.values():
+            sink.close(timeout)
+
+    def get_stats(self):
+        return {name: sink.get_stats() for name, sink in self.sinks.items()}
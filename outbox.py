@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Надежная очередь уведомлений (outbox) в SQLite
+Строка (item_id, канал) записывается до отметки товара как просмотренного; канал подтверждает
+доставку, неудачи повторяются с экспоненциальной паузой, после сбоя процесса недоставленное
+отправляется заново без нового сканирования
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Collection, Iterable, List, Tuple
+
+from item_store import connect
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    item_id      TEXT NOT NULL,
+    sink         TEXT NOT NULL,
+    payload      TEXT NOT NULL,
+    state        TEXT NOT NULL DEFAULT 'pending',
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    created_at   REAL NOT NULL,
+    sent_at      REAL,
+    last_error   TEXT,
+    PRIMARY KEY (item_id, sink)
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(state, next_attempt);
+"""
+
+# Состояния строки
+PENDING = "pending"
+SENT = "sent"
+DEAD = "dead"  # попытки исчерпаны
+
+
+class NotificationOutbox:
+    """Outbox с ключом идемпотентности (item_id, канал) и доставкой не менее одного раза"""
+
+    def __init__(self, path: str = "vinted_items.db", lease: float = 300.0, max_attempts: int = 10,
+                 backoff_base: float = 5.0, backoff_max: float = 900.0, keep_sent_hours: float = 24.0):
+        self.path = path
+        self.lease = lease  # на столько строка "занята" отправкой, затем считается потерянной
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.keep_sent_hours = keep_sent_hours
+        self._conn = None
+        self._lock = threading.Lock()
+
+        # Статистика
+        self.enqueued = 0
+        self.acked = 0
+        self.retries = 0
+        self.dead = 0
+        self.replayed = 0
+        self.write_errors = 0
+
+    def start(self) -> bool:
+        """Создание таблицы; строки, занятые отправкой до сбоя процесса, снова становятся доступны"""
+        if self._conn is not None:
+            return True
+        try:
+            conn = connect(self.path)
+            conn.executescript(SCHEMA)
+            with conn:
+                conn.execute("UPDATE outbox SET next_attempt = ? WHERE state = ?", (time.time(), PENDING))
+                if self.keep_sent_hours:
+                    conn.execute("DELETE FROM outbox WHERE state = ? AND sent_at < ?",
+                                 (SENT, time.time() - self.keep_sent_hours * 3600))
+            pending = conn.execute("SELECT COUNT(*) FROM outbox WHERE state = ?", (PENDING,)).fetchone()[0]
+        except Exception as e:
+            logging.error(f"❌ Ошибка инициализации outbox {self.path}: {e}")
+            return False
+        self._conn = conn
+        self.replayed = pending
+        if pending:
+            logging.info(f"📮 Outbox: {pending} недоставленных уведомлений будут отправлены повторно")
+        return True
+
+    def add(self, notification: dict, sinks: Iterable[str]) -> List[str]:
+        """Запись уведомления для каналов (сразу занято отправкой); возвращает каналы, для которых строка новая"""
+        if self._conn is None:
+            return list(sinks)
+        now = time.time()
+        payload = json.dumps(notification, ensure_ascii=False)
+        added = []
+        try:
+            with self._lock, self._conn:
+                for sink in sinks:
+                    cursor = self._conn.execute(
+                        "INSERT OR IGNORE INTO outbox (item_id, sink, payload, next_attempt, created_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (str(notification['item_id']), sink, payload, now + self.lease, now))
+                    if cursor.rowcount:
+                        added.append(sink)
+        except sqlite3.Error as e:
+            self.write_errors += 1
+            logging.error(f"❌ Ошибка записи в outbox: {e}")
+            return list(sinks)
+        self.enqueued += len(added)
+        return added
+
+    def claim_due(self, sinks: Iterable[str], limit: int = 100,
+                  in_flight: Collection[Tuple[str, str]] = ()) -> List[Tuple[str, dict]]:
+        """Строки, которым пора на (повторную) отправку; занимаются на время lease.
+        in_flight - ключи (item_id, канал), которые еще ждут в очереди канала или отправляются:
+        их lease продлевается, повторно они не выдаются"""
+        if self._conn is None:
+            return []
+        sinks = list(sinks)
+        if not sinks:
+            return []
+        now = time.time()
+        placeholders = ",".join("?" * len(sinks))
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                f"SELECT item_id, sink, payload FROM outbox WHERE state = ? AND next_attempt <= ? "
+                f"AND sink IN ({placeholders}) ORDER BY next_attempt LIMIT ?",
+                (PENDING, now, *sinks, limit)).fetchall()
+            self._conn.executemany(
+                "UPDATE outbox SET next_attempt = ? WHERE item_id = ? AND sink = ?",
+                [(now + self.lease, item_id, sink) for item_id, sink, _ in rows])
+        return [(sink, json.loads(payload)) for item_id, sink, payload in rows
+                if (item_id, sink) not in in_flight]
+
+    def ack(self, item_id, sink: str):
+        """Доставка подтверждена каналом"""
+        if self._conn is None:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE outbox SET state = ?, sent_at = ?, attempts = attempts + 1 WHERE item_id = ? AND sink = ?",
+                (SENT, time.time(), str(item_id), sink))
+        self.acked += 1
+
+    def fail(self, item_id, sink: str, error: str = ""):
+        """Неудачная доставка: повтор через base * 2^попытки (не больше backoff_max) или dead"""
+        if self._conn is None:
+            return
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT attempts FROM outbox WHERE item_id = ? AND sink = ?",
+                                     (str(item_id), sink)).fetchone()
+            if row is None:
+                return
+            attempts = row[0] + 1
+            if attempts >= self.max_attempts:
+                state, delay = DEAD, 0.0
+                self.dead += 1
+                logging.error(f"❌ Outbox [{sink}]: уведомление {item_id} не доставлено за {attempts} попыток")
+            else:
+                state, delay = PENDING, min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+                self.retries += 1
+            self._conn.execute(
+                "UPDATE outbox SET state = ?, attempts = ?, next_attempt = ?, last_error = ? "
+                "WHERE item_id = ? AND sink = ?",
+                (state, attempts, time.time() + delay, error[:200], str(item_id), sink))
+
+    def forget_delivered(self) -> int:
+        """Удаление доставленных и исчерпавших попытки строк (сброс истории, /restart):
+        эти товары снова будут отправлены; ожидающие доставки строки остаются"""
+        if self._conn is None:
+            return 0
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM outbox WHERE state != ?", (PENDING,))
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def get_stats(self):
+        stats = {
+            'enqueued': self.enqueued,
+            'acked': self.acked,
+            'retries': self.retries,
+            'dead': self.dead,
+            'replayed': self.replayed,
+            'write_errors': self.write_errors,
+            'pending': {},
+        }
+        if self._conn is not None:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT sink, COUNT(*) FROM outbox WHERE state = ? GROUP BY sink", (PENDING,)).fetchall()
+            stats['pending'] = {sink: count for sink, count in rows}
+        return stats
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Планировщик запросов: объединение пересекающихся запросов топиков
+Один более широкий запрос к каталогу вместо нескольких, товары раздаются топикам локальными фильтрами
+"""
+
+import logging
+from typing import Dict, List, Optional
+
+# Режимы объединения: off - без объединения, price - только запросы, различающиеся лишь price_to,
+# brand - еще и объединение брендов при одинаковых каталогах и тексте поиска
+MODES = ("off", "price", "brand")
+MAX_PER_PAGE = 96
+
+# Параметры, которые не влияют на набор подходящих товаров
+_PAGING_KEYS = ("page", "per_page")
+
+
+def parse_ids(value) -> frozenset:
+    """'1, 2,3' -> {'1', '2', '3'}"""
+    return frozenset(part.strip() for part in str(value or "").split(",") if part.strip())
+
+
+def _parse_price(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _item_price(item: dict) -> Optional[float]:
+    return _parse_price((item.get("price") or {}).get("amount"))
+
+
+class TopicQuery:
+    """Запрос одного топика и его фильтры"""
+
+    def __init__(self, name: str, params: dict):
+        self.name = name
+        self.params = dict(params)
+        self.price_to = _parse_price(params.get("price_to"))
+        self.brands = parse_ids(params.get("brand_ids"))
+        self.catalogs = parse_ids(params.get("catalog_ids"))
+        self.text = str(params.get("search_text") or "").strip().lower()
+        try:
+            self.per_page = int(params.get("per_page") or 2)
+        except ValueError:
+            self.per_page = 2
+
+    def matches(self, item: dict, plan: "QueryPlan") -> Optional[bool]:
+        """Подходит ли товар топику; проверяется только то, чем запрос топика уже запроса плана.
+        None - проверить нельзя (в товаре нет нужного поля)"""
+        if self.price_to is not None and self.price_to != plan.price_to:
+            price = _item_price(item)
+            if price is None:
+                return None
+            if price > self.price_to:
+                return False
+        if self.brands and self.brands != plan.brands:
+            brand_id = item.get("brand_id")
+            if brand_id is None:
+                return None
+            if str(brand_id) not in self.brands:
+                return False
+        if self.catalogs and self.catalogs != plan.catalogs:
+            catalog_id = item.get("catalog_id")
+            if catalog_id is None:
+                return None
+            if str(catalog_id) not in self.catalogs:
+                return False
+        if self.text and self.text != plan.text:
+            title = str(item.get("title") or "").lower()
+            if not all(word in title for word in self.text.split()):
+                return False
+        return True
+
+
+class QueryPlan:
+    """Один запрос к каталогу на группу топиков"""
+
+    def __init__(self, members: List[TopicQuery], max_per_page: int = MAX_PER_PAGE):
+        self.members = members
+        self.name = members[0].name if len(members) == 1 else " | ".join(m.name for m in members)
+
+        params = dict(members[0].params)
+        if len(members) > 1:
+            prices = [m.price_to for m in members]
+            self.price_to = None if None in prices else max(prices)
+            if self.price_to is None:
+                params.pop("price_to", None)
+            else:
+                params["price_to"] = f"{self.price_to:g}"
+            if any(not m.brands for m in members):
+                self.brands = frozenset()
+            else:
+                self.brands = frozenset().union(*(m.brands for m in members))
+            params["brand_ids"] = ",".join(sorted(self.brands))
+            params["per_page"] = str(min(max_per_page, sum(m.per_page for m in members)))
+        else:
+            self.price_to = members[0].price_to
+            self.brands = members[0].brands
+        self.catalogs = members[0].catalogs
+        self.text = members[0].text
+        self.params = params
+
+        # Статистика
+        self.unroutable = 0  # товары без поля для фильтра, отданные топикам без проверки
+
+    @property
+    def merged(self) -> bool:
+        return len(self.members) > 1
+
+    def route(self, items: List[dict]) -> Dict[str, List[dict]]:
+        """Раздача товаров общей выдачи топикам-участникам (порядок newest_first сохраняется)"""
+        if not self.merged:
+            return {self.members[0].name: list(items)}
+        routed = {m.name: [] for m in self.members}
+        for item in items:
+            unroutable = False
+            for member in self.members:
+                matched = member.matches(item, self)
+                if matched is None:
+                    # Проверить фильтр нельзя - товар отдается топику, лишнее лучше пропуска
+                    unroutable = True
+                if matched is not False:
+                    routed[member.name].append(item)
+            if unroutable:
+                self.unroutable += 1
+        return routed
+
+
+class QueryPlanner:
+    """Группировка запросов топиков в план запросов"""
+
+    def __init__(self, mode: str = "price", max_per_page: int = MAX_PER_PAGE):
+        if mode not in MODES:
+            logging.warning(f"⚠️ Неизвестный режим объединения запросов: {mode}, используется off")
+            mode = "off"
+        self.mode = mode
+        self.max_per_page = max_per_page
+        self.plans = []
+
+    def _merge_key(self, query: TopicQuery):
+        if self.mode == "off":
+            return query.name
+        ignored = set(_PAGING_KEYS) | {"price_to"}
+        if self.mode == "brand":
+            ignored.add("brand_ids")
+        params = tuple(sorted(
+            (key, ",".join(sorted(parse_ids(value))) if key.endswith("_ids") else str(value).strip())
+            for key, value in query.params.items() if key not in ignored
+        ))
+        return params
+
+    def plan(self, queries: Dict[str, dict]) -> List[QueryPlan]:
+        """Запросы топиков (имя -> параметры) -> список запросов к каталогу"""
+        groups = {}
+        for name, params in queries.items():
+            query = TopicQuery(name, params)
+            groups.setdefault(self._merge_key(query), []).append(query)
+
+        self.plans = [QueryPlan(members, self.max_per_page) for members in groups.values()]
+        for plan in self.plans:
+            if plan.merged:
+                logging.info(f"🔗 Объединены запросы: {plan.name} (per_page={plan.params.get('per_page')})")
+        return self.plans
+
+    def get_stats(self):
+        return {
+            'mode': self.mode,
+            'topics': sum(len(plan.members) for plan in self.plans),
+            'fetches': len(self.plans),
+            'merged_groups': sum(1 for plan in self.plans if plan.merged),
+            'unroutable': sum(plan.unroutable for plan in self.plans),
+        }
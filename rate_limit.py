@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Ограничение частоты запросов (token bucket)
+Потокобезопасно: можно ждать и в рабочих потоках, и в asyncio
+TelegramRateLimiter - общий, по чатам и по темам лимит отправки в Telegram
+"""
+
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """Token bucket: rate токенов в секунду, не больше capacity подряд"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+        # Статистика
+        self.acquired = 0
+        self.waited = 0
+        self.total_wait = 0.0
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """Резервирует токены и возвращает, сколько секунд нужно подождать (0 - сразу)"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= tokens
+            self.acquired += 1
+            if self._tokens >= 0:
+                return 0.0
+            wait = -self._tokens / self.rate
+            self.waited += 1
+            self.total_wait += wait
+            return wait
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Блокирующее ожидание токена (для рабочих потоков)"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: float = 1.0) -> float:
+        """Неблокирующее ожидание токена (для asyncio)"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def get_stats(self):
+        return {
+            'rate': self.rate,
+            'capacity': self.capacity,
+            'acquired': self.acquired,
+            'waited': self.waited,
+            'total_wait': self.total_wait,
+        }
+
+
+def telegram_retry_after(response) -> float:
+    """retry_after (в секундах) из ответа Telegram с ошибкой 429 или из исключения RetryAfter"""
+    retry_after = getattr(response, "retry_after", None)
+    if retry_after is not None:
+        # python-telegram-bot: int или timedelta в зависимости от версии
+        return float(retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else retry_after)
+    try:
+        return float(response.json().get("parameters", {}).get("retry_after", 0))
+    except Exception:
+        return 0.0
+
+
+class TelegramRateLimiter:
+    """Лимиты Telegram: общий на бота, на чат (в группах - в минуту) и на тему (thread) группы"""
+
+    def __init__(self, global_rate: float = 25.0, chat_rate: float = 1.0, group_per_minute: float = 20.0,
+                 thread_rate: float = 1.0, burst: float = 3.0):
+        self.global_bucket = TokenBucket(global_rate, capacity=global_rate)
+        self.chat_rate = chat_rate
+        self.group_rate = group_per_minute / 60.0
+        self.thread_rate = thread_rate
+        self.burst = burst
+        self._chats = {}
+        self._threads = {}
+        self._blocked_until = {}  # чат -> время, до которого Telegram просил не отправлять (retry_after)
+        self._lock = threading.Lock()
+
+        # Статистика
+        self.acquired = 0
+        self.total_wait = 0.0
+        self.flood_waits = 0
+        self.last_retry_after = 0.0
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        key = str(chat_id)
+        bucket = self._chats.get(key)
+        if bucket is None:
+            # Отрицательный chat_id - группа или канал
+            rate = self.group_rate if key.startswith("-") else self.chat_rate
+            bucket = TokenBucket(rate, capacity=self.burst)
+            self._chats[key] = bucket
+        return bucket
+
+    def _thread_bucket(self, chat_id, thread_id) -> TokenBucket:
+        key = (str(chat_id), thread_id)
+        bucket = self._threads.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.thread_rate, capacity=1.0)
+            self._threads[key] = bucket
+        return bucket
+
+    def reserve(self, chat_id, thread_id=None) -> float:
+        """Резервирует отправку и возвращает, сколько секунд нужно подождать"""
+        with self._lock:
+            buckets = [self.global_bucket, self._chat_bucket(chat_id)]
+            if thread_id:
+                buckets.append(self._thread_bucket(chat_id, thread_id))
+            blocked = self._blocked_until.get(str(chat_id), 0.0) - time.time()
+        wait = max([bucket.reserve() for bucket in buckets] + [blocked, 0.0])
+        with self._lock:
+            self.acquired += 1
+            self.total_wait += wait
+        return wait
+
+    def acquire(self, chat_id, thread_id=None) -> float:
+        """Блокирующее ожидание (потоки каналов доставки)"""
+        wait = self.reserve(chat_id, thread_id)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, chat_id, thread_id=None) -> float:
+        """Неблокирующее ожидание (команды бота в asyncio)"""
+        wait = self.reserve(chat_id, thread_id)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def penalize(self, chat_id, retry_after: float):
+        """Ответ 429: не отправлять в чат retry_after секунд"""
+        retry_after = max(1.0, retry_after)
+        with self._lock:
+            key = str(chat_id)
+            self._blocked_until[key] = max(self._blocked_until.get(key, 0.0), time.time() + retry_after)
+            self.flood_waits += 1
+            self.last_retry_after = retry_after
+
+    def get_stats(self):
+        with self._lock:
+            blocked = {chat: until - time.time() for chat, until in self._blocked_until.items() if until > time.time()}
+            return {
+                'acquired': self.acquired,
+                'avg_wait': self.total_wait / self.acquired if self.acquired else 0.0,
+                'flood_waits': self.flood_waits,
+                'last_retry_after': self.last_retry_after,
+                'blocked_chats': blocked,
+                'chats': len(self._chats),
+                'threads': len(self._threads),
+            }
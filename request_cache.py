@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Дедупликация одинаковых запросов к каталогу
+Single-flight: одновременные одинаковые запросы получают один ответ;
+короткий TTL-кэш (LRU с ограничением размера) для только что завершенных запросов
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+
+def normalize_key(url: str, params: dict) -> tuple:
+    """Ключ запроса: порядок параметров и списков ID не важен"""
+    normalized = []
+    for key, value in (params or {}).items():
+        value = str(value).strip()
+        if key.endswith("_ids"):
+            value = ",".join(sorted(part.strip() for part in value.split(",") if part.strip()))
+        normalized.append((key, value))
+    return (url, tuple(sorted(normalized)))
+
+
+class _Call:
+    """Запрос в процессе выполнения; остальные потоки ждут его результата"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class RequestCache:
+    """Single-flight + TTL LRU кэш ответов"""
+
+    def __init__(self, ttl: float = 2.0, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._cache = OrderedDict()  # ключ -> (время истечения, ответ)
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+        # Статистика
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.evictions = 0
+
+    def fetch(self, url: str, params: dict, loader: Callable, cache_if: Callable = bool):
+        """Ответ из кэша, из уже идущего запроса или от loader(); в кэш попадают ответы, для которых cache_if истинно"""
+        key = normalize_key(url, params)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                if entry[0] > time.time():
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._cache[key]
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._in_flight[key] = call
+                self.misses += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = loader()
+            if self.ttl > 0 and cache_if(call.result):
+                self._store(key, call.result)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            call.event.set()
+
+    def _store(self, key, result):
+        with self._lock:
+            self._cache[key] = (time.time() + self.ttl, result)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def get_stats(self):
+        total = self.hits + self.misses + self.shared
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'shared': self.shared,
+            'hit_rate': (self.hits + self.shared) / total if total else 0.0,
+            'size': len(self._cache),
+            'evictions': self.evictions,
+            'ttl': self.ttl,
+        }
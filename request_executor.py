@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Единый исполнитель запросов к каталогу
+Повторы, общий бюджет времени на топик, классификация ошибок и статистика в одном месте;
+базовая и продвинутая системы подключаются как транспорты
+"""
+
+import logging
+import random
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+# Классы результата попытки
+OK = "ok"
+AUTH = "auth"  # 401 - обновить cookies и повторить сразу
+THROTTLED = "throttled"  # 429/403/5xx - цепь хоста открыта, повторять бесполезно
+HTTP_ERROR = "http_error"  # прочие коды - повтор после паузы
+NETWORK = "network"  # исключение при запросе - повтор после паузы
+EMPTY = "empty"  # транспорт не вернул данных (повторы внутри него) - следующий транспорт
+
+
+class HTTPTransport:
+    """Базовая система: прямой запрос через общий пул соединений"""
+
+    direct = True  # запрос идет с нашего IP (под circuit breaker хоста)
+
+    def __init__(self, name: str, http_client, cookie_cache, antiblock, request_slot: Callable):
+        self.name = name
+        self.http_client = http_client
+        self.cookie_cache = cookie_cache
+        self.antiblock = antiblock
+        self.request_slot = request_slot
+
+    def attempt(self, url: str, params: dict, remaining: float) -> Tuple[Optional[dict], str, str]:
+        headers = self.antiblock.get_headers()
+        cookies = self.cookie_cache.get(headers)
+        connect_timeout, read_timeout = self.http_client.timeout
+        with self.request_slot(url):
+            response = self.http_client.get(
+                url,
+                params=params,
+                cookies=cookies,
+                headers=headers,
+                timeout=(connect_timeout, max(1.0, min(read_timeout, remaining))),
+            )
+        if response.status_code == 401:
+            self.cookie_cache.invalidate(cookies)
+            return None, AUTH, "HTTP 401"
+        if self.antiblock.handle_errors(response):
+            return None, THROTTLED, f"HTTP {response.status_code}"
+        if response.status_code != 200:
+            return None, HTTP_ERROR, f"HTTP {response.status_code}"
+        return response.json(), OK, ""
+
+
+class AdvancedTransport:
+    """Продвинутая система (с прокси или без): повторы и переаутентификация внутри make_http_request.
+    Прокси выбирается на каждый запрос, поэтому транспорты работают параллельно"""
+
+    def __init__(self, name: str, advanced_system, use_proxy: bool, request_slot: Callable):
+        self.name = name
+        self.advanced_system = advanced_system
+        self.use_proxy = use_proxy
+        self.direct = not use_proxy
+        self.request_slot = request_slot
+
+    def attempt(self, url: str, params: dict, remaining: float) -> Tuple[Optional[dict], str, str]:
+        if self.use_proxy and not self.advanced_system.proxies:
+            # Без прокси запрос ушел бы с нашего IP в обход circuit breaker
+            return None, EMPTY, "нет доступных прокси"
+        deadline = time.time() + remaining
+        with self.request_slot(url):
+            data = self.advanced_system.make_http_request(url, params, deadline=deadline, use_proxy=self.use_proxy)
+        if data and "items" in data:
+            return data, OK, ""
+        return None, EMPTY, "нет данных"
+
+
+class RequestExecutor:
+    """Цепочка транспортов с повторами в пределах бюджета времени топика"""
+
+    def __init__(self, max_attempts: int = 3, topic_budget: float = 10.0,
+                 backoff: Tuple[float, float] = (1.0, 3.0), on_attempt: Optional[Callable] = None):
+        self.max_attempts = max_attempts
+        self.topic_budget = topic_budget
+        self.backoff = backoff
+        self.on_attempt = on_attempt  # on_attempt(transport_name, success, reason) - статистика систем
+        self._lock = threading.Lock()
+
+        # Статистика
+        self.executions = 0
+        self.successes = 0
+        self.budget_exhausted = 0
+        self.outcomes = {}  # класс результата -> количество
+        self.latency = {}  # транспорт -> [попыток, суммарная задержка, максимальная задержка]
+
+    def _record(self, transport_name: str, outcome: str, reason: str, latency: float):
+        with self._lock:
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+            stats = self.latency.setdefault(transport_name, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += latency
+            stats[2] = max(stats[2], latency)
+        if self.on_attempt and outcome != AUTH:
+            self.on_attempt(transport_name, outcome == OK, reason)
+
+    def execute(self, topic_name: str, transports: List, url: str, params: dict) -> Tuple[Optional[dict], Optional[str]]:
+        """Данные каталога и имя транспорта, который их вернул (None, None - неудача)"""
+        deadline = time.time() + self.topic_budget
+        with self._lock:
+            self.executions += 1
+
+        for transport in transports:
+            for attempt in range(1, self.max_attempts + 1):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    with self._lock:
+                        self.budget_exhausted += 1
+                    logging.warning(f"⏳ [{topic_name}] Бюджет {self.topic_budget:.0f}s исчерпан")
+                    return None, None
+
+                started = time.time()
+                try:
+                    data, outcome, reason = transport.attempt(url, params, remaining)
+                except Exception as e:
+                    data, outcome, reason = None, NETWORK, str(e)[:60]
+                self._record(transport.name, outcome, reason, time.time() - started)
+
+                if outcome == OK:
+                    with self._lock:
+                        self.successes += 1
+                    return data, transport.name
+                logging.warning(f"⚠️ [{topic_name}] {transport.name} попытка {attempt}/{self.max_attempts}: {outcome} {reason}")
+                if outcome == THROTTLED:
+                    return None, None
+                if outcome == EMPTY:
+                    break
+                if outcome == AUTH:
+                    continue
+                if attempt < self.max_attempts:
+                    pause = min(random.uniform(*self.backoff), max(0.0, deadline - time.time()))
+                    time.sleep(pause)
+        return None, None
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'executions': self.executions,
+                'successes': self.successes,
+                'budget_exhausted': self.budget_exhausted,
+                'outcomes': dict(self.outcomes),
+                'latency': {
+                    name: {
+                        'attempts': count,
+                        'avg': total / count if count else 0.0,
+                        'max': worst,
+                    }
+                    for name, (count, total, worst) in self.latency.items()
+                },
+            }
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+asyncio-движок сканирования
+Несколько топиков запрашиваются одновременно под общим лимитом запросов в секунду
+и ограничением числа одновременных соединений на хост
+"""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from rate_limit import TokenBucket
+
+
+class AsyncScanEngine:
+    """Выполнение блокирующих HTTP-запросов в пуле потоков под управлением asyncio"""
+
+    def __init__(self, max_workers: int = 6, requests_per_second: float = 2.0, per_host: int = 3):
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scan")
+        self.budget = TokenBucket(requests_per_second, capacity=max(1.0, requests_per_second))
+        self._host_slots = {}
+        self._lock = threading.Lock()
+
+        # Статистика
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def _slots_for(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            slots = self._host_slots.get(host)
+            if slots is None:
+                slots = threading.BoundedSemaphore(self.per_host)
+                self._host_slots[host] = slots
+            return slots
+
+    @contextmanager
+    def request_slot(self, url: str):
+        """Слот на один HTTP-запрос: соединение к хосту + токен общего бюджета"""
+        slots = self._slots_for(urlparse(url).netloc)
+        with slots:
+            self.budget.acquire()
+            with self._lock:
+                self.requests += 1
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                yield
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+
+    async def run_blocking(self, func, *args, **kwargs):
+        """Запуск блокирующей функции в пуле потоков"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    def get_stats(self):
+        return {
+            'workers': self.max_workers,
+            'per_host': self.per_host,
+            'requests_per_second': self.budget.rate,
+            'requests': self.requests,
+            'in_flight': self.in_flight,
+            'max_in_flight': self.max_in_flight,
+            'budget_waits': self.budget.waited,
+        }
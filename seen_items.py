@@ -0,0 +1,573 @@
+#!/usr/bin/env python3
+"""
+Хранилище просмотренных товаров для дедупликации
+O(1) проверка и вставка по целочисленному item_id
+
+Формат на диске:
+- vinted_items.bin      - отсортированные uint64 ID (memory-mapped, бинарный поиск)
+- vinted_items.bin.tail - append-only хвост новых ID, периодически сливается в .bin
+- vinted_items.bin.meta - состояние политики хранения (порог вытеснения, контрольные точки)
+
+Политика хранения: ID Vinted растут монотонно, а все топики запрашивают newest_first,
+поэтому ID ниже порога вытеснения больше не появятся и удаляются при компактизации.
+"""
+
+import array
+import bisect
+import heapq
+import json
+import logging
+import mmap
+import os
+import threading
+import time
+
+MAGIC = b"VSEEN\x00\x00\x01"
+HEADER_SIZE = len(MAGIC)
+ID_SIZE = 8
+
+
+class GroupCommitWriter:
+    """Фоновая пакетная запись (group commit) в append-only файл"""
+
+    def __init__(self, path: str, flush_every: int = 64, flush_interval_ms: float = 500, fsync: bool = False):
+        self.path = path
+        self.flush_every = max(1, flush_every)
+        self.flush_interval = max(0.0, flush_interval_ms / 1000)
+        self.fsync = fsync
+
+        # Синхронный режим: каждая запись сразу уходит на диск
+        self.synchronous = self.flush_every == 1 and self.flush_interval == 0
+
+        self._buffer = []
+        self._file = None
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._running = False
+        self._thread = None
+
+        # Статистика
+        self.batches = 0
+        self.items_written = 0
+        self.write_errors = 0
+        self.last_flush_ms = 0.0
+
+    def start(self):
+        """Запуск фонового потока записи"""
+        if self.synchronous or self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True, name="seen-writer")
+        self._thread.start()
+
+    def write(self, data: bytes):
+        """Постановка записи в буфер (на горячем пути - без системных вызовов)"""
+        if self.synchronous:
+            self._write_batch([data])
+            return
+        with self._cond:
+            self._buffer.append(data)
+            if len(self._buffer) >= self.flush_every:
+                self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._running and len(self._buffer) < self.flush_every:
+                    self._cond.wait(timeout=self.flush_interval or None)
+                batch = self._buffer
+                self._buffer = []
+                running = self._running
+            if batch:
+                self._write_batch(batch)
+            if not running:
+                break
+
+    def _write_batch(self, batch):
+        started = time.time()
+        with self._io_lock:
+            try:
+                if self._file is None:
+                    self._file = open(self.path, "ab")
+                self._file.write(b"".join(batch))
+                self._file.flush()
+                if self.fsync:
+                    os.fsync(self._file.fileno())
+                self.batches += 1
+                self.items_written += len(batch)
+            except Exception as e:
+                self.write_errors += 1
+                logging.error(f"Save error: {e}")
+        self.last_flush_ms = (time.time() - started) * 1000
+
+    def flush(self):
+        """Синхронный сброс буфера (перед компактизацией и при завершении)"""
+        with self._cond:
+            batch = self._buffer
+            self._buffer = []
+        if batch:
+            self._write_batch(batch)
+
+    def reset(self, discard: bool = False):
+        """Закрытие файла (например, после усечения или удаления)"""
+        if discard:
+            with self._cond:
+                self._buffer = []
+        else:
+            self.flush()
+        with self._io_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def rewrite(self, data: bytes):
+        """Замена содержимого файла; буфер отбрасывается (его ID должны быть в data или уже в базе)"""
+        with self._cond:
+            self._buffer = []
+        with self._io_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            with open(self.path, "wb") as f:
+                f.write(data)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+
+    def close(self):
+        """Остановка потока с полным сбросом буфера"""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.reset()
+
+    def get_stats(self):
+        return {
+            'pending': len(self._buffer),
+            'batches': self.batches,
+            'items_written': self.items_written,
+            'avg_batch': self.items_written / self.batches if self.batches else 0.0,
+            'last_flush_ms': self.last_flush_ms,
+            'write_errors': self.write_errors,
+            'fsync': self.fsync,
+        }
+
+
+class SeenItemStore:
+    """Множество уже обработанных item_id с компактным хранением на диске"""
+
+    def __init__(self, path: str = "vinted_items.bin", legacy_path: str = "vinted_items.txt",
+                 compact_threshold: int = 20000, max_entries: int = 0, max_age_seconds: float = 0,
+                 topic_floor: bool = False, topic_floor_margin: int = 0,
+                 retention_check_interval: float = 600, flush_every: int = 64,
+                 flush_interval_ms: float = 500, fsync: bool = False):
+        self.path = path
+        self.tail_path = path + ".tail"
+        self.meta_path = path + ".meta"
+        self.legacy_path = legacy_path
+        self.compact_threshold = compact_threshold
+
+        # ПОЛИТИКА ХРАНЕНИЯ (0 / False - критерий отключен)
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.topic_floor = topic_floor
+        self.topic_floor_margin = topic_floor_margin
+        self.retention_check_interval = retention_check_interval
+        self.floor = 0  # ID ниже порога считаются просмотренными
+        self.evicted_count = 0
+        self._checkpoints = []  # [(время, максимальный ID на тот момент)]
+        self._max_id = 0
+        self._topic_floors = {}
+        self._tracked_topics = set()
+        self._last_retention_check = time.time()
+
+        # Отсортированная база (mmap) + свежие ID из хвоста
+        self._file = None
+        self._mm = None
+        self._view = None
+        self._base = ()
+        self._recent = set()
+        self._writer = GroupCommitWriter(self.tail_path, flush_every, flush_interval_ms, fsync)
+        self._lock = threading.RLock()
+        # Компактизация идет в фоновом потоке, одна за раз
+        self._compact_lock = threading.Lock()
+        self._compacting = False
+        self._compact_thread = None
+
+        # Статистика
+        self.loaded_count = 0
+        self.added_count = 0
+        self.save_errors = 0
+        self.compactions = 0
+        self.migrated_count = 0
+
+    @staticmethod
+    def _key(item_id) -> int:
+        """Нормализация item_id к int (в файле и API ID приходят строкой или числом)"""
+        return int(item_id)
+
+    def _in_base(self, key: int) -> bool:
+        base = self._base
+        i = bisect.bisect_left(base, key)
+        return i < len(base) and base[i] == key
+
+    def __contains__(self, item_id) -> bool:
+        try:
+            key = self._key(item_id)
+        except (TypeError, ValueError):
+            return False
+        with self._lock:
+            return key < self.floor or key in self._recent or self._in_base(key)
+
+    def __len__(self) -> int:
+        return len(self._base) + len(self._recent)
+
+    # ЗАГРУЗКА
+
+    def load(self) -> int:
+        """Загрузка: миграция txt -> bin, mmap базы и чтение хвоста"""
+        with self._lock:
+            try:
+                self._migrate_legacy()
+                self._load_meta()
+                self._map_base()
+                self._load_tail()
+                if len(self._recent) >= self.compact_threshold:
+                    self.compact()
+            except Exception as e:
+                logging.error(f"❌ Ошибка загрузки {self.path}: {e}")
+            self._writer.start()
+
+            self.loaded_count = len(self)
+            if self.loaded_count == 0:
+                logging.info("Starting fresh")
+            return self.loaded_count
+
+    def _migrate_legacy(self):
+        """Одноразовая миграция из текстового vinted_items.txt"""
+        if not self.legacy_path or os.path.exists(self.path) or not os.path.exists(self.legacy_path):
+            return
+
+        ids = set()
+        with open(self.legacy_path, "r", errors="ignore") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    ids.add(int(line))
+                except ValueError:
+                    logging.warning(f"⚠️ Пропущен некорректный ID в {self.legacy_path}: {line[:30]}")
+
+        self._write_base(sorted(ids))
+        os.replace(self.legacy_path, self.legacy_path + ".migrated")
+        self.migrated_count = len(ids)
+        logging.info(f"📦 Миграция {self.legacy_path} -> {self.path}: {len(ids)} ID")
+
+    def _write_base(self, sorted_ids):
+        """Атомарная запись отсортированной базы"""
+        self._install_base(self._write_base_file(sorted_ids))
+
+    def _write_base_file(self, sorted_ids) -> str:
+        """Запись базы во временный файл с fsync (без блокировки хранилища)"""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC)
+            if not isinstance(sorted_ids, array.array):
+                sorted_ids = array.array("Q", sorted_ids)
+            sorted_ids.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        return tmp_path
+
+    def _install_base(self, tmp_path: str):
+        self._unmap_base()
+        os.replace(tmp_path, self.path)
+
+    def _map_base(self):
+        """Memory-map базы: старт O(1), ID не копируются в память процесса"""
+        self._unmap_base()
+        if not os.path.exists(self.path):
+            return
+
+        f = open(self.path, "rb")
+        size = os.fstat(f.fileno()).st_size
+        if size < HEADER_SIZE or f.read(HEADER_SIZE) != MAGIC:
+            f.close()
+            broken_path = self.path + ".corrupt"
+            os.replace(self.path, broken_path)
+            logging.error(f"❌ Неверный формат {self.path}, файл перемещен в {broken_path}")
+            return
+
+        self._file = f
+        self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        count = (size - HEADER_SIZE) // ID_SIZE
+        self._view = memoryview(self._mm)
+        self._base = self._view[HEADER_SIZE:HEADER_SIZE + count * ID_SIZE].cast("Q")
+
+    def _unmap_base(self):
+        if isinstance(self._base, memoryview):
+            self._base.release()
+        if self._view is not None:
+            self._view.release()
+        if self._mm is not None:
+            self._mm.close()
+        if self._file is not None:
+            self._file.close()
+        self._base = ()
+        self._view = None
+        self._mm = None
+        self._file = None
+
+    def _load_tail(self):
+        """Чтение хвоста (после сбоя в нем могут быть ID, уже попавшие в базу)"""
+        if not os.path.exists(self.tail_path):
+            return
+        with open(self.tail_path, "rb") as f:
+            raw = f.read()
+        usable = len(raw) - len(raw) % ID_SIZE
+        tail_ids = array.array("Q")
+        tail_ids.frombytes(raw[:usable])
+        for key in tail_ids:
+            if key >= self.floor and not self._in_base(key):
+                self._recent.add(key)
+
+    def _load_meta(self):
+        try:
+            with open(self.meta_path, "r") as f:
+                meta = json.load(f)
+            self.floor = int(meta.get("floor", 0))
+            self.evicted_count = int(meta.get("evicted", 0))
+            self._checkpoints = [(float(ts), int(cp_id)) for ts, cp_id in meta.get("checkpoints", [])]
+            if self._checkpoints:
+                self._max_id = self._checkpoints[-1][1]
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.warning(f"⚠️ Ошибка чтения {self.meta_path}: {e}")
+
+    def _save_meta(self):
+        try:
+            tmp_path = self.meta_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({
+                    "floor": self.floor,
+                    "evicted": self.evicted_count,
+                    "checkpoints": self._checkpoints,
+                }, f)
+            os.replace(tmp_path, self.meta_path)
+        except Exception as e:
+            logging.warning(f"⚠️ Ошибка записи {self.meta_path}: {e}")
+
+    # ЗАПИСЬ
+
+    def add(self, item_id) -> bool:
+        """Добавление ID в память и на диск. Возвращает False, если ID уже был"""
+        key = self._key(item_id)
+        with self._lock:
+            if key < self.floor or key in self._recent or self._in_base(key):
+                return False
+            self._recent.add(key)
+            self.added_count += 1
+            self._note_max_id(key)
+            self._writer.write(array.array("Q", [key]).tobytes())
+
+            if len(self._recent) >= self.compact_threshold:
+                self._schedule_compaction()
+        return True
+
+    def _schedule_compaction(self) -> bool:
+        """Компактизация в фоновом потоке: add() и цикл сканера не ждут записи базы"""
+        with self._lock:
+            if self._compacting:
+                return False
+            self._compacting = True
+        self._compact_thread = threading.Thread(target=self._compact_in_background, daemon=True,
+                                                name="seen-compact")
+        self._compact_thread.start()
+        return True
+
+    def _compact_in_background(self):
+        try:
+            self.compact()
+        finally:
+            with self._lock:
+                self._compacting = False
+
+    def compact(self):
+        """Слияние хвоста с отсортированной базой и вытеснение по политике хранения.
+        Новая база пишется без блокировки хранилища; ID, добавленные за это время, остаются в хвосте"""
+        with self._compact_lock:
+            try:
+                with self._lock:
+                    floor = self._retention_floor(time.time())
+                    snapshot = set(self._recent)
+                    before = len(self._base) + len(snapshot)
+                    start = bisect.bisect_left(self._base, floor)
+                    base = array.array("Q")
+                    if len(self._base) > start:
+                        base.frombytes(self._base[start:].tobytes())
+
+                recent = sorted(key for key in snapshot if key >= floor)
+                merged = array.array("Q", heapq.merge(base, recent))
+                if self.max_entries and len(merged) > self.max_entries:
+                    merged = merged[len(merged) - self.max_entries:]
+                    floor = merged[0]
+                tmp_path = self._write_base_file(merged)
+
+                with self._lock:
+                    self._install_base(tmp_path)
+                    self._map_base()
+                    self.floor = max(self.floor, floor)
+                    self._recent = {key for key in self._recent if key not in snapshot and key >= self.floor}
+                    # В хвосте остаются только ID, не вошедшие в новую базу
+                    self._writer.rewrite(array.array("Q", sorted(self._recent)).tobytes())
+                    self.evicted_count += before - len(merged)
+                    self._save_meta()
+                    self.compactions += 1
+                logging.info(f"🗜️ Компактизация seen-ID: {len(merged)} ID в {self.path} "
+                             f"(вытеснено: {before - len(merged)}, порог: {self.floor})")
+            except Exception as e:
+                self.save_errors += 1
+                logging.error(f"❌ Ошибка компактизации {self.path}: {e}")
+                with self._lock:
+                    if not self._base and os.path.exists(self.path):
+                        self._map_base()
+
+    # ПОЛИТИКА ХРАНЕНИЯ
+
+    def _note_max_id(self, key: int):
+        """Контрольные точки (время, max ID) раз в минуту - для вытеснения по возрасту"""
+        if key > self._max_id:
+            self._max_id = key
+        now = time.time()
+        if not self._checkpoints or now - self._checkpoints[-1][0] >= 60:
+            self._checkpoints.append((now, self._max_id))
+            self._prune_checkpoints(now)
+
+    def _prune_checkpoints(self, now: float):
+        """Храним только точки моложе max_age и одну самую свежую из более старых"""
+        if not self.max_age_seconds:
+            self._checkpoints = self._checkpoints[-1:]
+            return
+        cutoff = now - self.max_age_seconds
+        old = [cp for cp in self._checkpoints if cp[0] <= cutoff]
+        self._checkpoints = old[-1:] + [cp for cp in self._checkpoints if cp[0] > cutoff]
+
+    def set_tracked_topics(self, topic_names):
+        """Список топиков, которые должны сообщить свое окно ID до вытеснения по топикам"""
+        with self._lock:
+            self._tracked_topics = set(topic_names)
+            for name in list(self._topic_floors):
+                if name not in self._tracked_topics:
+                    del self._topic_floors[name]
+
+    def note_topic_window(self, topic_name: str, item_ids):
+        """Запоминает минимальный ID из последней выдачи топика (newest_first)"""
+        ids = []
+        for item_id in item_ids:
+            try:
+                ids.append(self._key(item_id))
+            except (TypeError, ValueError):
+                continue
+        if ids:
+            with self._lock:
+                self._topic_floors[topic_name] = min(ids)
+
+    def _retention_floor(self, now: float) -> int:
+        """Порог вытеснения: максимум из порогов по возрасту и по окнам топиков"""
+        floor = self.floor
+
+        if self.max_age_seconds:
+            cutoff = now - self.max_age_seconds
+            old = [cp_id for ts, cp_id in self._checkpoints if ts <= cutoff]
+            if old:
+                floor = max(floor, max(old) + 1)
+
+        if self.topic_floor and self._tracked_topics:
+            if all(name in self._topic_floors for name in self._tracked_topics):
+                topic_floor = min(self._topic_floors[name] for name in self._tracked_topics)
+                floor = max(floor, topic_floor - self.topic_floor_margin)
+
+        return floor
+
+    def maybe_enforce_retention(self) -> bool:
+        """Периодическая проверка: фоновая компактизация, если политика позволяет что-то вытеснить"""
+        now = time.time()
+        if now - self._last_retention_check < self.retention_check_interval:
+            return False
+        self._last_retention_check = now
+
+        with self._lock:
+            self._prune_checkpoints(now)
+            floor = self._retention_floor(now)
+            over_limit = self.max_entries and len(self) > self.max_entries
+            below_floor = (len(self._base) and self._base[0] < floor) or any(key < floor for key in self._recent)
+            if not over_limit and not below_floor:
+                return False
+            return self._schedule_compaction()
+
+    def get_retention_policy(self):
+        """Описание политики хранения для /status"""
+        return {
+            'max_entries': self.max_entries,
+            'max_age_hours': self.max_age_seconds / 3600 if self.max_age_seconds else 0,
+            'topic_floor': self.topic_floor,
+            'topic_floor_margin': self.topic_floor_margin,
+            'topics_reported': len([name for name in self._tracked_topics if name in self._topic_floors]),
+            'topics_tracked': len(self._tracked_topics),
+            'floor': self.floor,
+            'evicted': self.evicted_count,
+        }
+
+    def flush(self):
+        """Сброс буфера записи на диск (например, по сигналу завершения)"""
+        self._writer.flush()
+
+    def clear(self):
+        """Полная очистка памяти и файлов"""
+        with self._compact_lock, self._lock:
+            self._unmap_base()
+            self._writer.reset(discard=True)
+            self._recent.clear()
+            self.loaded_count = 0
+            self.added_count = 0
+            self.floor = 0
+            self.evicted_count = 0
+            self._checkpoints = []
+            self._max_id = 0
+            self._topic_floors.clear()
+            for file_path in (self.path, self.tail_path, self.meta_path):
+                try:
+                    if os.path.exists(file_path):
+                        os.remove(file_path)
+                except Exception as e:
+                    logging.error(f"❌ Ошибка очистки {file_path}: {e}")
+
+    def close(self):
+        """Закрытие файлов (хвост уже на диске, компактизация не обязательна)"""
+        self._writer.close()
+        with self._compact_lock, self._lock:
+            self._save_meta()
+            self._unmap_base()
+
+    def get_stats(self):
+        """Статистика хранилища"""
+        return {
+            'count': len(self),
+            'base_count': len(self._base),
+            'tail_count': len(self._recent),
+            'loaded': self.loaded_count,
+            'added': self.added_count,
+            'compactions': self.compactions,
+            'evicted': self.evicted_count,
+            'floor': self.floor,
+            'migrated': self.migrated_count,
+            'save_errors': self.save_errors + self._writer.write_errors,
+            'writer': self._writer.get_stats(),
+            'path': self.path,
+            'file_size': os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+        }
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Клиент Slack incoming webhook
+Запросы идут через общий пул соединений, не чаще лимита Slack (~1 сообщение в секунду на webhook);
+при 429 соблюдается Retry-After, несколько товаров отправляются одним сообщением Block Kit
+"""
+
+import logging
+import time
+from typing import List
+
+from circuit_breaker import parse_retry_after
+from rate_limit import TokenBucket
+
+# Лимит Slack - 50 блоков в сообщении
+MAX_BLOCKS = 50
+
+
+class SlackWebhook:
+    """Отправка сообщений в один webhook с лимитом частоты и повторами по Retry-After"""
+
+    def __init__(self, url: str, http_client, rate: float = 1.0, max_retries: int = 3,
+                 max_retry_after: float = 60.0):
+        self.url = url
+        self.http_client = http_client
+        self.bucket = TokenBucket(rate, capacity=1.0)
+        self.max_retries = max_retries
+        self.max_retry_after = max_retry_after
+
+        # Статистика
+        self.messages = 0
+        self.items = 0
+        self.failed = 0
+        self.throttled = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.last_latency = 0.0
+
+    def post(self, payload: dict, item_count: int = 1) -> bool:
+        """Отправка сообщения; задержка пачки считается от начала ожидания до ответа Slack"""
+        started = time.time()
+        ok = False
+        for attempt in range(self.max_retries):
+            self.bucket.acquire()
+            response = self.http_client.post(self.url, json=payload)
+            if response.status_code == 200:
+                ok = True
+                break
+            if response.status_code != 429:
+                logging.warning(f"⚠️ Slack: HTTP {response.status_code} {response.text[:60]}")
+                break
+            self.throttled += 1
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            retry_after = min(self.max_retry_after, retry_after if retry_after is not None else 1.0)
+            logging.warning(f"⏱️ Slack 429: Retry-After {retry_after:.0f}s")
+            time.sleep(retry_after)
+
+        latency = time.time() - started
+        self.last_latency = latency
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        if ok:
+            self.messages += 1
+            self.items += item_count
+        else:
+            self.failed += 1
+        return ok
+
+    def get_stats(self):
+        attempts = self.messages + self.failed
+        return {
+            'messages': self.messages,
+            'items': self.items,
+            'failed': self.failed,
+            'throttled': self.throttled,
+            'items_per_message': self.items / self.messages if self.messages else 0.0,
+            'avg_latency': self.total_latency / attempts if attempts else 0.0,
+            'max_latency': self.max_latency,
+            'last_latency': self.last_latency,
+        }
+
+
+def item_blocks(title: str, price: str, url: str, image: str = None, size: str = None) -> List[dict]:
+    """Блоки Block Kit для одного товара: текст со ссылкой и превью фото"""
+    size_text = f"\n👕 {size}" if size else ""
+    section = {
+        "type": "section",
+        "text": {"type": "mrkdwn", "text": f"*<{url}|{title}>*\n🏷️ {price}{size_text}"},
+    }
+    if image:
+        section["accessory"] = {"type": "image", "image_url": image, "alt_text": str(title)[:100]}
+    return [section, {"type": "divider"}]
+
+
+def batch_payloads(items: List[List[dict]], text: str = "Vinted Scanner") -> List[tuple]:
+    """Блоки товаров -> [(сообщение, число товаров)], не больше MAX_BLOCKS блоков в сообщении;
+    text - текст push-уведомления Slack"""
+    payloads = []
+    blocks, count = [], 0
+    for item in items:
+        if blocks and len(blocks) + len(item) > MAX_BLOCKS:
+            payloads.append(({"text": text, "blocks": blocks}, count))
+            blocks, count = [], 0
+        blocks.extend(item)
+        count += 1
+    if blocks:
+        payloads.append(({"text": text, "blocks": blocks}, count))
+    return payloads
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Постоянное SMTP-соединение для email-уведомлений
+Подключение, STARTTLS и вход выполняются один раз; соединение переиспользуется, закрывается после
+простоя и переоткрывается при обрыве
+"""
+
+import logging
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
+
+
+class PooledSMTP:
+    """Одно авторизованное SMTP-соединение, общее для всех писем"""
+
+    def __init__(self, server: str, port: int = 587, username: str = "", password: str = "",
+                 starttls: bool = True, idle_timeout: float = 60.0, timeout: float = 20.0):
+        self.server = server
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._smtp = None
+        self._last_used = 0.0
+        self._lock = threading.Lock()
+
+        # Статистика
+        self.sent = 0
+        self.connections = 0
+        self.reconnects = 0
+        self.total_latency = 0.0
+        self.last_latency = 0.0
+
+    def _connect(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(self.server, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        self.connections += 1
+        logging.info(f"📧 SMTP соединение открыто: {self.server}:{self.port}")
+        return smtp
+
+    def _drop(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                self._smtp.close()
+            self._smtp = None
+
+    def send(self, msg: EmailMessage):
+        """Отправка письма через открытое соединение; при обрыве - одно переподключение и повтор"""
+        started = time.time()
+        with self._lock:
+            if self._smtp is not None and started - self._last_used > self.idle_timeout:
+                # Сервер мог уже закрыть простаивающее соединение
+                self._drop()
+            for attempt in range(2):
+                if self._smtp is None:
+                    self._smtp = self._connect()
+                try:
+                    self._smtp.send_message(msg)
+                    break
+                except (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError):
+                    self._drop()
+                    if attempt:
+                        raise
+                    self.reconnects += 1
+                except Exception:
+                    # Состояние сессии неизвестно - следующее письмо откроет новое соединение
+                    self._drop()
+                    raise
+            self._last_used = time.time()
+            self.sent += 1
+            self.last_latency = self._last_used - started
+            self.total_latency += self.last_latency
+
+    def close(self):
+        with self._lock:
+            self._drop()
+
+    def get_stats(self):
+        return {
+            'sent': self.sent,
+            'connections': self.connections,
+            'reconnects': self.reconnects,
+            'connected': self._smtp is not None,
+            'avg_latency': self.total_latency / self.sent if self.sent else 0.0,
+            'last_latency': self.last_latency,
+        }
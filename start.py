@@ -6,6 +6,7 @@ This ensures proper Python environment and imports
 
 import sys
 import os
+import runpy
 
 # Add current directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -13,8 +14,8 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 # Import and run the main scanner
 if __name__ == "__main__":
     try:
-        from vinted_scanner import main
-        main()
+        # Запуск как скрипта: vinted_scanner настраивает лог только при __name__ == "__main__"
+        runpy.run_module("vinted_scanner", run_name="__main__")
     except ImportError:
         # Fallback: execute as subprocess
         import subprocess
@@ -0,0 +1,37 @@
+"""Circuit breaker: пробный запрос в half_open и ответы на запросы, начатые раньше"""
+
+from circuit_breaker import CLOSED, HALF_OPEN, CircuitBreaker
+
+
+def test_only_admitted_probe_closes_circuit():
+    breaker = CircuitBreaker("vinted")
+    normal = breaker.allow()
+    breaker.trip(0, "HTTP 429")
+    probe = breaker.allow()
+
+    assert breaker.state == HALF_OPEN
+    assert probe[0] and not normal[0]
+
+    # Запрос, пропущенный до открытия цепи, не закрывает ее и не освобождает пробу
+    breaker.record_success(normal)
+    breaker.release(normal)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is None
+
+    breaker.record_success(probe)
+    breaker.release(probe)
+    assert breaker.state == CLOSED
+
+
+def test_stale_probe_does_not_release_new_probe():
+    breaker = CircuitBreaker("vinted")
+    breaker.trip(0, "HTTP 429")
+    old_probe = breaker.allow()
+    breaker.trip(0, "HTTP 403")
+    new_probe = breaker.allow()
+
+    breaker.release(old_probe)
+    assert breaker.allow() is None
+
+    breaker.release(new_probe)
+    assert breaker.allow() is not None
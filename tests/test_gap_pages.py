@@ -0,0 +1,51 @@
+"""Дозагрузка страниц при разрыве выдачи (fetch_gap_pages / is_gap_page)"""
+
+import asyncio
+
+import pytest
+
+import vinted_scanner as vs
+from query_planner import QueryPlan, TopicQuery
+
+TOPIC = {
+    "query": {"page": "1", "per_page": "2", "catalog_ids": "1904"},
+    "exclude_catalog_ids": "26,98",
+    "thread_id": 1,
+}
+
+
+@pytest.fixture
+def plan(monkeypatch):
+    monkeypatch.setitem(vs.Config.topics, "bags", TOPIC)
+    monkeypatch.setattr(vs.topic_watermarks, "get", lambda name: 100)
+    return QueryPlan([TopicQuery("bags", TOPIC["query"])])
+
+
+@pytest.fixture
+def fetched(monkeypatch):
+    calls = []
+
+    async def run_blocking(func, name, params):
+        calls.append(params["page"])
+        return {"items": []}, "basic"
+
+    monkeypatch.setattr(vs.scan_engine, "run_blocking", run_blocking)
+    return calls
+
+
+def test_excluded_only_page_is_not_a_gap(plan, fetched):
+    items = [{"id": 500, "catalog_id": 26}, {"id": 501, "catalog_id": 98}]
+    assert asyncio.run(vs.fetch_gap_pages(plan, items)) == items
+    assert fetched == []
+
+
+def test_items_at_or_below_watermark_are_seen(plan, fetched):
+    items = [{"id": 500, "catalog_id": 1904}, {"id": 100, "catalog_id": 1904}]
+    assert asyncio.run(vs.fetch_gap_pages(plan, items)) == items
+    assert fetched == []
+
+
+def test_page_of_new_items_fetches_next_page(plan, fetched):
+    items = [{"id": 501, "catalog_id": 1904}, {"id": 500, "catalog_id": 26}]
+    asyncio.run(vs.fetch_gap_pages(plan, items))
+    assert fetched == ["2"]
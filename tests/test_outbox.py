@@ -0,0 +1,80 @@
+"""Outbox уведомлений: повторная выдача строк и подтверждение доставки"""
+
+import threading
+import time
+
+from notifier import NotificationDispatcher
+from outbox import NotificationOutbox
+
+
+def make_outbox(tmp_path, **kwargs):
+    outbox = NotificationOutbox(str(tmp_path / "outbox.db"), **kwargs)
+    assert outbox.start()
+    return outbox
+
+
+def test_claim_due_skips_rows_in_flight(tmp_path):
+    outbox = make_outbox(tmp_path, lease=0.0)
+    outbox.add({'item_id': 1, 'title': "a"}, ["telegram"])
+    outbox.add({'item_id': 2, 'title': "b"}, ["telegram"])
+
+    claimed = outbox.claim_due(["telegram"], in_flight={("1", "telegram")})
+
+    assert [n['item_id'] for _, n in claimed] == [2]
+
+
+def test_queued_row_is_not_sent_twice(tmp_path):
+    # Lease истекает, пока уведомление ждет в очереди канала за медленной отправкой
+    outbox = make_outbox(tmp_path, lease=0.0)
+    release = threading.Event()
+    sent = []
+
+    def send(notification):
+        release.wait(5)
+        sent.append(notification['item_id'])
+        return True
+
+    dispatcher = NotificationDispatcher(outbox=outbox, retry_interval=0.01)
+    dispatcher.add_sink("telegram", send)
+    dispatcher.start()
+    dispatcher.dispatch({'item_id': 1, 'title': "a"})
+    dispatcher.dispatch({'item_id': 2, 'title': "b"})
+    time.sleep(0.2)
+    release.set()
+    dispatcher.close()
+
+    assert sorted(sent) == [1, 2]
+    assert outbox.get_stats()['pending'] == {}
+    outbox.close()
+
+
+def test_batch_acks_each_item(tmp_path):
+    # Из пачки доставлен только первый товар - повтор нужен только второму
+    outbox = make_outbox(tmp_path, backoff_base=60.0)
+    delivered = []
+    dispatcher = NotificationDispatcher(outbox=outbox, retry_interval=60.0,
+                                        on_delivered=lambda n, sink: delivered.append(n['item_id']))
+    dispatcher.add_sink("slack", lambda n: True, send_batch=lambda batch: [True, False], batch_window=0.2)
+    dispatcher.start()
+    dispatcher.dispatch({'item_id': 1, 'title': "a"})
+    dispatcher.dispatch({'item_id': 2, 'title': "b"})
+    dispatcher.close()
+
+    assert delivered == [1]
+    assert outbox.get_stats()['pending'] == {"slack": 1}
+    stats = dispatcher.get_stats()["slack"]
+    assert (stats['sent'], stats['failed']) == (1, 1)
+    outbox.close()
+
+
+def test_forget_delivered_allows_renotify(tmp_path):
+    # /restart сбрасывает историю: доставленный товар снова новый, ожидающий не дублируется
+    outbox = make_outbox(tmp_path)
+    outbox.add({'item_id': 1, 'title': "a"}, ["telegram"])
+    outbox.add({'item_id': 2, 'title': "b"}, ["telegram"])
+    outbox.ack(1, "telegram")
+
+    assert outbox.forget_delivered() == 1
+    assert outbox.add({'item_id': 1, 'title': "a"}, ["telegram"]) == ["telegram"]
+    assert outbox.add({'item_id': 2, 'title': "b"}, ["telegram"]) == []
+    outbox.close()
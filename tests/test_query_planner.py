@@ -0,0 +1,55 @@
+"""Объединение запросов топиков и раздача общей выдачи"""
+
+from query_planner import QueryPlanner
+
+
+def query(**params):
+    base = {'page': '1', 'per_page': '2', 'search_text': '', 'catalog_ids': '19',
+            'brand_ids': '', 'order': 'newest_first'}
+    base.update(params)
+    return base
+
+
+def item(item_id, price=None, brand_id=None):
+    data = {'id': item_id, 'title': f"item {item_id}"}
+    if price is not None:
+        data['price'] = {'amount': str(price), 'currency_code': "EUR"}
+    if brand_id is not None:
+        data['brand_id'] = brand_id
+    return data
+
+
+def test_price_mode_merges_queries_that_differ_only_in_price():
+    planner = QueryPlanner("price")
+    plans = planner.plan({"cheap": query(price_to='20'), "any": query(price_to='80'),
+                          "other": query(price_to='20', catalog_ids='82')})
+
+    assert planner.get_stats()['fetches'] == 2
+    merged = next(plan for plan in plans if plan.merged)
+    assert merged.params['price_to'] == "80"
+    assert merged.params['per_page'] == "4"
+
+    routed = merged.route([item(2, price=50), item(1, price=10)])
+    assert [i['id'] for i in routed["cheap"]] == [1]
+    assert [i['id'] for i in routed["any"]] == [2, 1]
+
+
+def test_brand_mode_merges_brands():
+    planner = QueryPlanner("brand")
+    plans = planner.plan({"a": query(brand_ids='1'), "b": query(brand_ids='2')})
+
+    assert len(plans) == 1
+    routed = plans[0].route([item(2, brand_id=2), item(1, brand_id=1)])
+    assert [i['id'] for i in routed["a"]] == [1]
+    assert [i['id'] for i in routed["b"]] == [2]
+
+
+def test_item_without_filter_field_goes_to_every_member():
+    planner = QueryPlanner("price")
+    plan, = planner.plan({"cheap": query(price_to='20'), "any": query(price_to='80')})
+
+    routed = plan.route([item(1)])
+
+    assert [i['id'] for i in routed["cheap"]] == [1]
+    assert [i['id'] for i in routed["any"]] == [1]
+    assert planner.get_stats()['unroutable'] == 1
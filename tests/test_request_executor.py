@@ -0,0 +1,45 @@
+"""Транспорты продвинутой системы: выбор прокси на запрос и параллельные запросы"""
+
+import threading
+from contextlib import nullcontext
+
+from request_executor import EMPTY, OK, AdvancedTransport
+
+
+class FakeAdvancedSystem:
+    def __init__(self, proxies):
+        self.proxies = proxies
+        self.calls = []
+        self.barrier = threading.Barrier(2, timeout=5)
+
+    def make_http_request(self, url, params, deadline=None, use_proxy=None):
+        self.calls.append(use_proxy)
+        # Оба запроса должны оказаться внутри одновременно
+        self.barrier.wait()
+        return {"items": []}
+
+
+def test_transports_run_concurrently_with_per_call_proxy_choice():
+    system = FakeAdvancedSystem(proxies=[{"host": "proxy"}])
+    direct = AdvancedTransport("advanced_no_proxy", system, False, lambda url: nullcontext())
+    proxied = AdvancedTransport("advanced_proxy", system, True, lambda url: nullcontext())
+    results = {}
+
+    threads = [threading.Thread(target=lambda t=t: results.__setitem__(t.name, t.attempt("url", {}, 5.0)))
+               for t in (direct, proxied)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results["advanced_no_proxy"][1] == OK
+    assert results["advanced_proxy"][1] == OK
+    assert sorted(system.calls) == [False, True]
+
+
+def test_proxy_transport_without_proxies_sends_nothing():
+    system = FakeAdvancedSystem(proxies=[])
+    proxied = AdvancedTransport("advanced_proxy", system, True, lambda url: nullcontext())
+
+    assert proxied.attempt("url", {}, 5.0) == (None, EMPTY, "нет доступных прокси")
+    assert system.calls == []
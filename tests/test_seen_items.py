@@ -0,0 +1,64 @@
+"""Хранилище просмотренных ID: фоновая компактизация не блокирует проверки и запись"""
+
+import threading
+
+from seen_items import SeenItemStore
+
+
+def make_store(tmp_path, **kwargs):
+    store = SeenItemStore(str(tmp_path / "seen.bin"), legacy_path="", flush_every=1, flush_interval_ms=0,
+                          **kwargs)
+    store.load()
+    return store
+
+
+def wait_for_compaction(store):
+    if store._compact_thread is not None:
+        store._compact_thread.join(timeout=5)
+
+
+def test_add_and_lookup_during_compaction(tmp_path, monkeypatch):
+    store = make_store(tmp_path, compact_threshold=3)
+    writing = threading.Event()
+    release = threading.Event()
+    write_base_file = store._write_base_file
+
+    def slow_write_base_file(sorted_ids):
+        writing.set()
+        release.wait(5)
+        return write_base_file(sorted_ids)
+
+    monkeypatch.setattr(store, "_write_base_file", slow_write_base_file)
+    for item_id in (1, 2, 3):
+        assert store.add(item_id)
+    assert writing.wait(5)
+
+    # База пишется в фоне - хранилище отвечает без ожидания
+    assert store.add(10)
+    assert 2 in store and 10 in store
+    release.set()
+    wait_for_compaction(store)
+
+    assert store.compactions == 1
+    assert store.get_stats()['base_count'] == 3
+    assert store.get_stats()['tail_count'] == 1
+    store.close()
+
+    reopened = make_store(tmp_path, compact_threshold=3)
+    assert all(item_id in reopened for item_id in (1, 2, 3, 10))
+    assert len(reopened) == 4
+    reopened.close()
+
+
+def test_retention_compacts_in_background(tmp_path):
+    store = make_store(tmp_path, max_entries=2, retention_check_interval=0)
+    for item_id in (1, 2, 3, 4):
+        store.add(item_id)
+
+    assert store.maybe_enforce_retention()
+    wait_for_compaction(store)
+
+    assert store.floor == 3
+    assert 1 in store  # ниже порога - считается просмотренным
+    assert len(store) == 2
+    store.close()
@@ -0,0 +1,175 @@
+"""Постоянное SMTP-соединение и email-дайджест против локального SMTP-сервера"""
+
+import logging
+import smtplib
+import socket
+import threading
+import time
+from email.message import EmailMessage
+
+import pytest
+
+import vinted_scanner as vs
+from notifier import NotificationSink
+from smtp_client import PooledSMTP
+
+
+class FakeSMTPServer:
+    """Минимальный SMTP-сервер: считает соединения и принятые письма.
+    handshake_delay - задержка приветствия и входа (как у удаленного сервера с TLS)"""
+
+    def __init__(self, handshake_delay=0.0):
+        self.handshake_delay = handshake_delay
+        self.connections = 0
+        self.messages = []
+        self._clients = []
+        self._sock = socket.socket()
+        self._sock.bind(("127.0.0.1", 0))
+        self._sock.listen()
+        self.port = self._sock.getsockname()[1]
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                client, _ = self._sock.accept()
+            except OSError:
+                return
+            self.connections += 1
+            self._clients.append(client)
+            threading.Thread(target=self._serve, args=(client,), daemon=True).start()
+
+    def _serve(self, client):
+        stream = client.makefile("rwb")
+
+        def reply(line):
+            stream.write(line.encode() + b"\r\n")
+            stream.flush()
+
+        try:
+            time.sleep(self.handshake_delay)
+            reply("220 localhost")
+            while True:
+                line = stream.readline()
+                if not line:
+                    break
+                command = line.decode().strip().upper()
+                if command.startswith("EHLO"):
+                    reply("250-localhost\r\n250 AUTH PLAIN")
+                elif command.startswith("AUTH"):
+                    time.sleep(self.handshake_delay)
+                    reply("235 ok")
+                elif command == "DATA":
+                    reply("354 go")
+                    body = []
+                    while (line := stream.readline()).strip() != b".":
+                        body.append(line.decode())
+                    self.messages.append("".join(body))
+                    reply("250 ok")
+                elif command == "QUIT":
+                    reply("221 bye")
+                    break
+                else:
+                    reply("250 ok")
+        except OSError:
+            pass
+        client.close()
+
+    def disconnect_all(self):
+        """Сервер разрывает все открытые соединения"""
+        for client in self._clients:
+            try:
+                client.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def close(self):
+        self.disconnect_all()
+        self._sock.close()
+
+
+@pytest.fixture
+def server():
+    server = FakeSMTPServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def client(server):
+    client = PooledSMTP("127.0.0.1", server.port, "user", "password", starttls=False, timeout=5)
+    yield client
+    client.close()
+
+
+def message(subject="test"):
+    msg = EmailMessage()
+    msg["To"] = "to@example.com"
+    msg["From"] = "from@example.com"
+    msg["Subject"] = subject
+    msg.set_content("body")
+    return msg
+
+
+def test_connection_is_reused(server, client):
+    for i in range(5):
+        client.send(message(f"item {i}"))
+
+    assert len(server.messages) == 5
+    assert server.connections == 1
+    assert client.get_stats()['connections'] == 1
+
+
+def test_reconnects_after_server_disconnect(server, client):
+    client.send(message("before"))
+    server.disconnect_all()
+    client.send(message("after"))
+
+    assert server.connections == 2
+    assert client.get_stats()['reconnects'] == 1
+    assert "Subject: after" in server.messages[-1]
+
+
+def test_digest_sends_single_message(server, client, monkeypatch):
+    monkeypatch.setattr(vs, "smtp_client", client)
+    monkeypatch.setattr(vs.Config, "smtp_toaddrs", ["to@example.com"])
+    monkeypatch.setattr(vs.Config, "smtp_username", "from@example.com")
+    sink = NotificationSink("email", lambda n: False, send_batch=vs.send_email_digest, batch_window=0.2)
+    results = []
+    sink.on_result = lambda notifications, ok, error: results.extend([ok] * len(notifications))
+    sink.start()
+    for i in range(3):
+        sink.put({'item_id': i, 'title': f"Item {i}", 'price': "10 EUR", 'url': f"https://example.com/{i}",
+                  'image': None, 'size': "M", 'enqueued_at': 0.0})
+    sink.close()
+
+    assert results == [True, True, True]
+    assert len(server.messages) == 1
+    assert all(f"Item {i}" in server.messages[0] for i in range(3))
+    assert server.connections == 1
+
+
+def test_pooled_send_is_faster_than_connection_per_message():
+    # Прежняя отправка: подключение и вход на каждое письмо
+    server = FakeSMTPServer(handshake_delay=0.05)
+    count = 5
+    try:
+        started = time.perf_counter()
+        for i in range(count):
+            with smtplib.SMTP("127.0.0.1", server.port, timeout=5) as smtp:
+                smtp.login("user", "password")
+                smtp.send_message(message(f"item {i}"))
+        per_message = time.perf_counter() - started
+
+        client = PooledSMTP("127.0.0.1", server.port, "user", "password", starttls=False, timeout=5)
+        started = time.perf_counter()
+        for i in range(count):
+            client.send(message(f"item {i}"))
+        pooled = time.perf_counter() - started
+        client.close()
+    finally:
+        server.close()
+
+    logging.info(f"SMTP, {count} писем: соединение на письмо {per_message:.3f}s, общее соединение {pooled:.3f}s")
+    assert len(server.messages) == 2 * count
+    assert pooled < per_message / 2
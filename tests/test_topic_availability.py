@@ -0,0 +1,30 @@
+"""Кэш доступности тем: какие темы проверять и учет попаданий"""
+
+from topic_availability import TopicAvailability
+
+
+def test_stale_does_not_count_hits():
+    availability = TopicAvailability(ttl=60)
+    availability.record(1, True)
+
+    assert availability.stale([1, 2, 2, None]) == [2]
+    assert availability.get_stats()['hits'] == 0
+
+
+def test_hit_counted_only_for_cached_answers():
+    availability = TopicAvailability(ttl=60)
+    availability.record(1, True)
+    availability.record(2, False, "topic closed", probe=True)
+
+    assert availability.get(1)[0] is True
+    assert availability.get(2, count_hit=False)[:2] == (False, "topic closed")
+    assert availability.get(3) is None
+    assert availability.get_stats()['hits'] == 1
+
+
+def test_expired_state_is_stale():
+    availability = TopicAvailability(ttl=-1)
+    availability.record(1, True)
+
+    assert availability.stale([1]) == [1]
+    assert availability.get(1) is None
@@ -0,0 +1,50 @@
+"""Прием обновлений Telegram через webhook: путь, secret token и передача в update_queue"""
+
+import asyncio
+import json
+import urllib.error
+import urllib.request
+from types import SimpleNamespace
+
+from webhook_server import SECRET_HEADER, WebhookReceiver
+
+SECRET = "s3cret"
+UPDATE = {
+    "update_id": 42,
+    "message": {"message_id": 1, "date": 0, "chat": {"id": -100, "type": "supergroup"}, "text": "/status"},
+}
+
+
+def post(port, path, secret=SECRET, body=UPDATE):
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{port}{path}", data=json.dumps(body).encode(), method="POST",
+        headers={"Content-Type": "application/json", SECRET_HEADER: secret})
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def test_webhook_routes_updates():
+    async def scenario():
+        application = SimpleNamespace(bot=None, update_queue=asyncio.Queue())
+        receiver = WebhookReceiver(application, asyncio.get_running_loop(), listen="127.0.0.1", port=0,
+                                   path="/telegram", secret_token=SECRET)
+        receiver.start()
+        try:
+            assert receiver.port != 0
+            assert await asyncio.to_thread(post, receiver.port, "/telegram", "wrong") == 403
+            assert await asyncio.to_thread(post, receiver.port, "/other") == 404
+            assert await asyncio.to_thread(post, receiver.port, "/telegram", body=None) == 400
+            assert await asyncio.to_thread(post, receiver.port, "/telegram") == 200
+            update = await asyncio.wait_for(application.update_queue.get(), timeout=5)
+        finally:
+            receiver.stop()
+        assert update.update_id == 42
+        assert update.message.text == "/status"
+        assert application.update_queue.empty()
+        stats = receiver.get_stats()
+        assert (stats['received'], stats['rejected'], stats['errors']) == (1, 1, 1)
+
+    asyncio.run(scenario())
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Кэш доступности тем (thread_id) группы Telegram
+Состояние берется из результатов настоящих отправок и проверок; проверять заново нужно только темы,
+состояние которых неизвестно или старше TTL
+"""
+
+import threading
+import time
+from typing import Iterable, List, Optional
+
+
+class TopicAvailability:
+    """thread_id -> (доступна, причина, время проверки) с TTL"""
+
+    def __init__(self, ttl: float = 3600.0):
+        self.ttl = ttl
+        self._state = {}
+        self._lock = threading.Lock()
+
+        # Статистика
+        self.learned = 0  # из отправок уведомлений
+        self.probed = 0  # активные проверки /topics
+        self.hits = 0
+
+    def record(self, thread_id, available: bool, reason: str = "", probe: bool = False):
+        if not thread_id:
+            return
+        with self._lock:
+            self._state[thread_id] = (available, reason, time.time())
+            if probe:
+                self.probed += 1
+            else:
+                self.learned += 1
+
+    def _fresh(self, thread_id) -> Optional[tuple]:
+        entry = self._state.get(thread_id)
+        if entry is None:
+            return None
+        available, reason, checked_at = entry
+        age = time.time() - checked_at
+        if age > self.ttl:
+            return None
+        return available, reason, age
+
+    def get(self, thread_id, count_hit: bool = True) -> Optional[tuple]:
+        """(доступна, причина, возраст в секундах) или None, если состояние неизвестно или устарело;
+        count_hit=False - ответ не из кэша (тема только что проверена), в hits не считается"""
+        with self._lock:
+            state = self._fresh(thread_id)
+            if state is not None and count_hit:
+                self.hits += 1
+            return state
+
+    def stale(self, thread_ids: Iterable) -> List:
+        """Темы, которые нужно проверить (без повторов, порядок сохраняется)"""
+        result = []
+        with self._lock:
+            for thread_id in thread_ids:
+                if thread_id and thread_id not in result and self._fresh(thread_id) is None:
+                    result.append(thread_id)
+        return result
+
+    def get_stats(self):
+        with self._lock:
+            now = time.time()
+            fresh = [entry for entry in self._state.values() if now - entry[2] <= self.ttl]
+            return {
+                'known': len(fresh),
+                'unavailable': sum(1 for entry in fresh if not entry[0]),
+                'learned': self.learned,
+                'probed': self.probed,
+                'hits': self.hits,
+                'ttl': self.ttl,
+            }
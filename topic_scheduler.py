@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Планировщик топиков по дедлайнам
+Куча (heap) топиков по времени следующего сканирования вместо фиксированного двойного прохода
+Адаптивный режим: интервал топика подстраивается под частоту появления новых товаров
+"""
+
+import heapq
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+# Пресеты /fast и /slow - множители к интервалам топиков
+DEFAULT_PRESETS = {"fast": 1.0, "slow": 4.0}
+
+
+class TopicScheduler:
+    """Очередь топиков по времени следующего сканирования"""
+
+    def __init__(self, default_interval: float = 12.0, presets: Optional[Dict[str, float]] = None,
+                 jitter: float = 0.1, adaptive: bool = False, min_interval: float = 4.0,
+                 max_interval: float = 120.0, target_new_per_poll: float = 0.5,
+                 half_life: float = 3600.0):
+        self.default_interval = default_interval
+        self.presets = dict(presets or DEFAULT_PRESETS)
+        self.preset = "fast" if "fast" in self.presets else next(iter(self.presets))
+        self.jitter = jitter
+
+        # Адаптивный интервал = target_new_per_poll / (новых товаров в секунду),
+        # частота - экспоненциально затухающее среднее с периодом полураспада half_life
+        self.adaptive = adaptive
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_new_per_poll = target_new_per_poll
+        self.half_life = half_life
+        self._rates = {}  # топик -> [затухающее число новых, затухающее время, время наблюдения]
+
+        self._heap = []  # (время, порядковый номер, топик)
+        self._due = {}  # актуальный дедлайн топика (старые записи в куче пропускаются)
+        self._seq = 0
+        self._intervals = {}
+        self._in_flight = set()
+        self.last_scan = {}
+        # /fast и /slow приходят из потока бота
+        self._lock = threading.RLock()
+
+        # Статистика
+        self.scans = 0
+        self.late_total = 0.0
+
+    def configure(self, topics: Dict[str, dict], now: Optional[float] = None):
+        """Интервалы из конфигурации топиков (scan_interval); все топики - к сканированию сразу"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._configure(topics, now)
+
+    def _configure(self, topics: Dict[str, dict], now: float):
+        self._intervals = {
+            name: float(data.get("scan_interval", self.default_interval))
+            for name, data in topics.items()
+        }
+        self._heap = []
+        self._due = {}
+        for name, base in self._intervals.items():
+            if name not in self._rates:
+                # Начальная оценка соответствует интервалу из конфигурации и затухает за half_life
+                self._rates[name] = [self.target_new_per_poll * self.half_life / base, self.half_life, now]
+            if name not in self._in_flight:
+                self._push(name, now)
+
+    def _push(self, topic_name: str, due: float):
+        self._seq += 1
+        self._due[topic_name] = due
+        heapq.heappush(self._heap, (due, self._seq, topic_name))
+
+    def base_interval(self, topic_name: str) -> float:
+        return self._intervals.get(topic_name, self.default_interval)
+
+    def arrival_rate(self, topic_name: str) -> Optional[float]:
+        """Оценка числа новых товаров в секунду (None - топик не отслеживается)"""
+        state = self._rates.get(topic_name)
+        if state is None or state[1] <= 0:
+            return None
+        return state[0] / state[1]
+
+    def adaptive_interval(self, topic_name: str) -> float:
+        """Интервал по частоте новых товаров в пределах [min_interval, max_interval]"""
+        rate = self.arrival_rate(topic_name)
+        if rate is None:
+            return self.base_interval(topic_name)
+        if rate <= 0:
+            return self.max_interval
+        return min(self.max_interval, max(self.min_interval, self.target_new_per_poll / rate))
+
+    def interval(self, topic_name: str) -> float:
+        """Целевой интервал с учетом пресета"""
+        base = self.adaptive_interval(topic_name) if self.adaptive else self.base_interval(topic_name)
+        return base * self.presets.get(self.preset, 1.0)
+
+    def record_outcome(self, topic_name: str, new_items: int, now: Optional[float] = None):
+        """Учет результата сканирования: сколько новых товаров пришло с прошлого наблюдения"""
+        now = time.time() if now is None else now
+        with self._lock:
+            state = self._rates.get(topic_name)
+            if state is None:
+                return
+            elapsed = max(0.0, now - state[2])
+            decay = 0.5 ** (elapsed / self.half_life)
+            state[0] = state[0] * decay + new_items
+            state[1] = state[1] * decay + elapsed
+            state[2] = now
+
+    def is_priority(self, topic_name: str) -> bool:
+        return self.base_interval(topic_name) < self.default_interval
+
+    def pop_due(self, now: Optional[float] = None, limit: Optional[int] = None) -> List[str]:
+        """Снимает с кучи топики, чей дедлайн наступил (не больше limit)"""
+        now = time.time() if now is None else now
+        due_topics = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now and (limit is None or len(due_topics) < limit):
+                due, _, name = heapq.heappop(self._heap)
+                if self._due.get(name) != due:
+                    continue
+                del self._due[name]
+                self._in_flight.add(name)
+                self.late_total += now - due
+                due_topics.append(name)
+        return due_topics
+
+    def reschedule(self, topic_name: str, now: Optional[float] = None, delay: Optional[float] = None):
+        """Следующее сканирование топика через его интервал (или через delay)"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._in_flight.discard(topic_name)
+            if topic_name not in self._intervals:
+                return
+            if delay is None:
+                self.last_scan[topic_name] = now
+                self.scans += 1
+                delay = self.interval(topic_name)
+                if self.jitter:
+                    delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+            self._push(topic_name, now + delay)
+
+    def next_deadline(self) -> Optional[float]:
+        """Ближайший дедлайн (None - все топики сейчас сканируются)"""
+        with self._lock:
+            while self._heap and self._due.get(self._heap[0][2]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+
+    def set_preset(self, preset: str, now: Optional[float] = None) -> bool:
+        """Смена пресета с пересчетом дедлайнов от времени последнего сканирования"""
+        if preset not in self.presets:
+            return False
+        now = time.time() if now is None else now
+        with self._lock:
+            self.preset = preset
+            for name in list(self._due):
+                last = self.last_scan.get(name, now)
+                self._push(name, max(now, last + self.interval(name)))
+        return True
+
+    def describe_preset(self, preset: Optional[str] = None) -> str:
+        """Интервалы пресета: приоритетные / обычные топики"""
+        factor = self.presets.get(preset or self.preset, 1.0)
+        intervals = sorted(set(self._intervals.values())) or [self.default_interval]
+        priority = [i for i in intervals if i < self.default_interval]
+        normal = [i for i in intervals if i >= self.default_interval]
+        parts = []
+        if priority:
+            parts.append(f"{min(priority) * factor:.0f}s priority")
+        if normal:
+            parts.append(f"{max(normal) * factor:.0f}s normal")
+        return ", ".join(parts)
+
+    def get_rates(self) -> Dict[str, Dict[str, float]]:
+        """Изученные частоты (новых в час) и итоговые интервалы по топикам"""
+        with self._lock:
+            return {
+                name: {
+                    'new_per_hour': (self.arrival_rate(name) or 0.0) * 3600,
+                    'interval': self.interval(name),
+                }
+                for name in self._intervals
+            }
+
+    def get_stats(self):
+        return {
+            'preset': self.preset,
+            'adaptive': self.adaptive,
+            'topics': len(self._intervals),
+            'in_flight': len(self._in_flight),
+            'scans': self.scans,
+            'avg_lateness': self.late_total / self.scans if self.scans else 0.0,
+            'next_deadline': self.next_deadline(),
+        }
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Отметки максимального item_id по топикам (high-water marks)
+Выдача идет newest_first, поэтому все, что не выше отметки, уже просмотрено
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+
+
+class TopicWatermarks:
+    """Сохраняемые между перезапусками максимальные ID по каждому топику"""
+
+    def __init__(self, path: str = "topic_watermarks.json"):
+        self.path = path
+        self._marks = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        # Запись файла (включая вызов из обработчика сигнала в том же потоке) - RLock
+        self._write_lock = threading.RLock()
+
+        # Статистика
+        self.early_exits = 0
+        self.skipped_items = 0
+        self.save_errors = 0
+        self.gap_events = {}  # топик -> сколько раз все товары страницы оказались новыми
+        self.gap_pages = 0
+
+    def load(self) -> int:
+        """Загрузка отметок из файла"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._marks = {name: int(mark) for name, mark in data.items()}
+            logging.info(f"📍 Загружены отметки топиков: {len(self._marks)}")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.error(f"❌ Ошибка загрузки {self.path}: {e}")
+        return len(self._marks)
+
+    def get(self, topic_name: str) -> int:
+        """Отметка топика (0 - топик еще не сканировался)"""
+        return self._marks.get(topic_name, 0)
+
+    def update(self, topic_name: str, item_id) -> bool:
+        """Поднимает отметку топика, если item_id выше текущей"""
+        item_id = int(item_id)
+        with self._lock:
+            if item_id <= self._marks.get(topic_name, 0):
+                return False
+            self._marks[topic_name] = item_id
+            self._dirty = True
+            return True
+
+    def record_early_exit(self, skipped: int):
+        with self._lock:
+            self.early_exits += 1
+            self.skipped_items += skipped
+
+    def record_gap(self, topic_name: str, pages: int):
+        """Разрыв: новых товаров больше, чем вмещает страница, догружено pages страниц"""
+        with self._lock:
+            self.gap_events[topic_name] = self.gap_events.get(topic_name, 0) + 1
+            self.gap_pages += pages
+
+    def save(self):
+        """Атомарная запись на диск (только если отметки изменились)"""
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                snapshot = dict(self._marks)
+                self._dirty = False
+            tmp_path = None
+            try:
+                # Уникальный временный файл: повторный вход из обработчика сигнала не портит начатую запись
+                fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(self.path) + ".",
+                                                suffix=".tmp", dir=os.path.dirname(self.path) or ".")
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(snapshot, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                self.save_errors += 1
+                self._dirty = True
+                logging.error(f"❌ Ошибка сохранения {self.path}: {e}")
+                if tmp_path and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    def clear(self):
+        """Сброс всех отметок"""
+        with self._lock:
+            self._marks.clear()
+            self._dirty = False
+        try:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+        except Exception as e:
+            logging.error(f"❌ Ошибка очистки {self.path}: {e}")
+
+    def get_stats(self):
+        return {
+            'topics': len(self._marks),
+            'early_exits': self.early_exits,
+            'skipped_items': self.skipped_items,
+            'save_errors': self.save_errors,
+            'gap_events': dict(self.gap_events),
+            'gap_pages': self.gap_pages,
+        }
@@ -3,7 +3,6 @@ import sys
 import time
 import json
 import Config
-import smtplib
 import logging
 import requests
 import email.utils
@@ -12,11 +11,32 @@ import signal
 import asyncio
 import threading
 import random
+import secrets
+import html
 from datetime import datetime
 from email.message import EmailMessage
 from logging.handlers import RotatingFileHandler
 from telegram import Update, Bot
 from telegram.ext import Application, CommandHandler, ContextTypes
+from telegram.error import BadRequest, Conflict, RetryAfter, TelegramError
+from seen_items import SeenItemStore
+from topic_watermarks import TopicWatermarks
+from item_store import ItemStore, item_record
+from scan_engine import AsyncScanEngine
+from rate_limit import TelegramRateLimiter, TokenBucket, telegram_retry_after
+from topic_scheduler import TopicScheduler
+from http_client import get_http_client
+from cookie_cache import get_cookie_cache
+from query_planner import QueryPlanner
+from request_cache import RequestCache
+from circuit_breaker import HostBreakers, parse_retry_after
+from request_executor import RequestExecutor, HTTPTransport, AdvancedTransport
+from notifier import NotificationDispatcher
+from outbox import NotificationOutbox
+from smtp_client import PooledSMTP
+from slack_client import SlackWebhook, item_blocks, batch_payloads
+from webhook_server import WebhookReceiver
+from topic_availability import TopicAvailability
 
 # Override config with environment variables if available (for Railway)
 if os.getenv('TELEGRAM_BOT_TOKEN'):
@@ -24,29 +44,27 @@ if os.getenv('TELEGRAM_BOT_TOKEN'):
 if os.getenv('TELEGRAM_CHAT_ID'):
     Config.telegram_chat_id = os.getenv('TELEGRAM_CHAT_ID')
 
-# Configure logging
-handler = RotatingFileHandler("vinted_scanner.log", maxBytes=5000000, backupCount=3)
-logging.basicConfig(handlers=[handler], 
-                    format="%(asctime)s - %(levelname)s - %(message)s", 
-                    level=logging.INFO)
+# Configure logging (только при запуске: импорт модуля, например в тестах, не создает файл лога)
+if __name__ == "__main__":
+    handler = RotatingFileHandler("vinted_scanner.log", maxBytes=5000000, backupCount=3)
+    logging.basicConfig(handlers=[handler], 
+                        format="%(asctime)s - %(levelname)s - %(message)s", 
+                        level=logging.INFO)
 
 # Global variables
-timeoutconnection = 30
-list_analyzed_items = []
+timeoutconnection = 30  # Таймаут уведомлений; запросы к Vinted - с таймаутами пула (http_connect_timeout/http_read_timeout)
 bot_running = True
 scanner_thread = None
-scan_mode = "fast"  # "fast" = 5-7s priority, 10-15s normal, "slow" = 15-20s priority, 30-45s normal
+webhook_receiver = None
+scan_mode = "fast"  # пресет интервалов топиков: "fast" - как в конфигурации, "slow" - в scan_presets["slow"] раз реже
 last_errors = []
 telegram_errors = []
 vinted_errors = []
 system_mode = "auto"  # auto, basic, advanced, proxy, noproxy
 
-# PRIORITY TOPICS - these scan more frequently
-PRIORITY_TOPICS = ["bags", "bags 2"]
-
-# ЗАЩИТА ОТ ДУБЛИРОВАНИЯ
-last_scan_time = {}  # Время последнего сканирования каждого топика
-min_scan_interval = 3  # Минимальный интервал между сканированиями одного топика (в секундах)
+# ПЛАНИРОВЩИК: интервал каждого топика задается в Config.topics (scan_interval),
+# топики с интервалом меньше default_scan_interval считаются приоритетными
+default_scan_interval = getattr(Config, "default_scan_interval", 12)
 
 # ПРОДВИНУТАЯ АНТИБАН СИСТЕМА
 try:
@@ -178,9 +196,16 @@ def update_system_stats(system_name, success=True):
             advanced_proxy_errors += 1
             logging.warning(f"❌ ПРОДВИНУТАЯ С ПРОКСИ: Ошибка ({advanced_proxy_errors})")
 
+def record_attempt(system_name, success, reason):
+    """Статистика систем по каждой попытке исполнителя запросов"""
+    update_system_stats(system_name, success=success)
+    if not success and reason:
+        add_error(reason[:30], "vinted")
+
 # ANTI-BLOCKING SYSTEM FOR VINTED
 class VintedAntiBlock:
-    def __init__(self):
+    def __init__(self, breakers=None):
+        self.breakers = breakers or HostBreakers()
         self.user_agents = [
             "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
             "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
@@ -233,26 +258,28 @@ class VintedAntiBlock:
         time.sleep(base_delay)
     
     def handle_errors(self, response):
-        """Обработка ошибок с адаптивными задержками"""
+        """Обработка ошибок: адаптивная пауза открывает цепь хоста вместо сна в потоке сканера"""
         self.consecutive_errors += 1
         self.last_error_time = time.time()
+        breaker = self.breakers.get(response.url)
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
         
         if response.status_code == 429:
             base_wait = 60 + (self.consecutive_errors * 15)
             wait = random.uniform(base_wait, base_wait + 60)
             logging.warning(f"Rate limit! Wait {wait:.0f}s (consecutive: {self.consecutive_errors})")
-            time.sleep(wait)
+            breaker.trip(retry_after if retry_after is not None else wait, "HTTP 429")
             return True
         elif response.status_code in [403, 503]:
             base_wait = 30 + (self.consecutive_errors * 10)
             wait = random.uniform(base_wait, base_wait + 30)
             logging.warning(f"Blocked! Wait {wait:.0f}s (consecutive: {self.consecutive_errors})")
-            time.sleep(wait)
+            breaker.trip(retry_after if retry_after is not None else wait, f"HTTP {response.status_code}")
             return True
         elif response.status_code in [500, 502, 504]:
             wait = random.uniform(10, 30)
             logging.warning(f"Server error {response.status_code}! Wait {wait:.0f}s")
-            time.sleep(wait)
+            breaker.trip(retry_after if retry_after is not None else wait, f"HTTP {response.status_code}")
             return True
         else:
             self.consecutive_errors = 0
@@ -270,33 +297,40 @@ class VintedAntiBlock:
 
 # ANTI-BLOCKING SYSTEM FOR TELEGRAM
 class TelegramAntiBlock:
-    def __init__(self):
+    def __init__(self, limiter=None):
+        self.limiter = limiter or TelegramRateLimiter()
+        self.bot = None  # асинхронный Bot приложения (для ответов на команды), задается в setup_bot
         self.message_count = 0
         self.last_message_time = 0
         self.consecutive_errors = 0
         self.last_error_time = 0
         self.error_backoff = 1  # Начальная задержка при ошибках
         
-    def safe_delay(self):
-        """СТРОГО 1 СЕКУНДА между сообщениями + защита от флуда"""
+    def safe_delay(self, chat_id=None, thread_id=None):
+        """Ожидание токенов: общий лимит бота, лимит чата и темы (+ retry_after после 429)"""
         self.message_count += 1
-        current_time = time.time()
-        
-        # Минимум 1 секунда между сообщениями
-        time_since_last = current_time - self.last_message_time
-        if time_since_last < 1.0:
-            sleep_time = 1.0 - time_since_last
-            time.sleep(sleep_time)
-        
-        # Дополнительная защита: каждые 20 сообщений - пауза 3-5 сек
-        if self.message_count % 20 == 0:
-            extra_delay = random.uniform(3, 5)
-            logging.info(f"🛡️ TG Anti-flood: {extra_delay:.1f}s pause after {self.message_count} messages")
-            time.sleep(extra_delay)
-        
+        self.limiter.acquire(chat_id or Config.telegram_chat_id, thread_id)
         self.last_message_time = time.time()
 
-    def handle_telegram_error(self, error_type):
+    def post(self, method, data, thread_id=None, max_retries=3):
+        """Запрос к Bot API под лимитером; при 429 ждет retry_after и повторяет"""
+        chat_id = data.get("chat_id")
+        response = None
+        for attempt in range(max_retries):
+            self.safe_delay(chat_id, thread_id)
+            response = requests.post(
+                f"https://api.telegram.org/bot{Config.telegram_bot_token}/{method}",
+                data=data,
+                timeout=timeoutconnection
+            )
+            if response.status_code != 429:
+                return response
+            retry_after = telegram_retry_after(response)
+            self.limiter.penalize(chat_id, retry_after)
+            logging.warning(f"⏱️ TG 429: retry_after {retry_after:.0f}s (чат {chat_id}, тема {thread_id})")
+        return response
+
+    def handle_telegram_error(self, error_type, sleep=True):
         """Обработка ошибок Telegram с экспоненциальной задержкой"""
         current_time = time.time()
         
@@ -307,100 +341,159 @@ class TelegramAntiBlock:
             backoff_time = min(2 ** self.consecutive_errors, 60)
             
             logging.warning(f"⚠️ TG Error {error_type}: {backoff_time}s backoff (errors: {self.consecutive_errors})")
-            time.sleep(backoff_time)
+            if sleep:
+                time.sleep(backoff_time)
             
             # Если много ошибок подряд, увеличиваем базовую задержку
             if self.consecutive_errors >= 5:
                 self.error_backoff = min(self.error_backoff * 2, 10)
                 logging.warning(f"🔄 TG: Увеличена базовая задержка до {self.error_backoff}s")
+            return backoff_time
         else:
             # Сброс счетчика при успешных запросах
             if self.consecutive_errors > 0:
                 logging.info(f"✅ TG: Сброс счетчика ошибок (было: {self.consecutive_errors})")
                 self.consecutive_errors = 0
                 self.error_backoff = 1
+            return 0
 
     async def safe_send_message(self, chat_id, message):
-        """Безопасная отправка сообщения с антибаном и самовосстановлением"""
+        """Безопасная отправка сообщения с антибаном и самовосстановлением.
+        Через асинхронный Bot приложения - ожидания и запросы не блокируют цикл событий бота"""
         max_retries = 3
         
         for attempt in range(max_retries):
             try:
-                # Антибан пауза с учетом ошибок
-                self.safe_delay()
+                # Лимиты Telegram (общий и чата) - ожидание без блокировки цикла бота
+                self.message_count += 1
+                await self.limiter.acquire_async(chat_id)
                 
-                # Дополнительная задержка при ошибках
-                if self.consecutive_errors > 0:
-                    time.sleep(self.error_backoff)
-                
-                # Отправка сообщения через Telegram API
-                response = requests.post(
-                    f"https://api.telegram.org/bot{Config.telegram_bot_token}/sendMessage",
-                    data={
-                        "chat_id": chat_id,
-                        "text": message,
-                        "parse_mode": "HTML"
-                    },
-                    timeout=timeoutconnection
-                )
+                await self.bot.send_message(chat_id=chat_id, text=message, parse_mode="HTML")
+                logging.info(f"✅ Сообщение отправлено в {chat_id}")
+                self.handle_telegram_error("success")
+                return True
                 
-                if response.status_code == 200:
-                    logging.info(f"✅ Сообщение отправлено в {chat_id}")
-                    self.handle_telegram_error("success")
-                    return True
-                elif response.status_code == 429:
-                    self.handle_telegram_error("429")
-                    if attempt < max_retries - 1:
-                        continue
-                else:
-                    add_error(f"TG send: {response.status_code}", "telegram")
-                    if attempt < max_retries - 1:
-                        time.sleep(2 ** attempt)  # Экспоненциальная задержка
-                        continue
-                    return False
-                    
-            except requests.exceptions.RequestException as e:
-                error_msg = str(e).lower()
-                if "conflict" in error_msg or "getupdates" in error_msg:
-                    self.handle_telegram_error("conflict")
-                    if attempt < max_retries - 1:
-                        continue
-                else:
-                    add_error(f"TG send error: {str(e)[:30]}", "telegram")
-                    if attempt < max_retries - 1:
-                        time.sleep(2 ** attempt)
-                        continue
-                    return False
+            except RetryAfter as e:
+                # Следующая попытка дождется retry_after через лимитер
+                self.consecutive_errors += 1
+                self.limiter.penalize(chat_id, telegram_retry_after(e))
+                if attempt < max_retries - 1:
+                    continue
+            except Conflict:
+                backoff_time = self.handle_telegram_error("conflict", sleep=False)
+                if attempt < max_retries - 1:
+                    await asyncio.sleep(backoff_time)
+                    continue
             except Exception as e:
                 add_error(f"TG send error: {str(e)[:30]}", "telegram")
                 if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)
+                    await asyncio.sleep(2 ** attempt)  # Экспоненциальная задержка
                     continue
                 return False
         
         return False
 
 # Global instances
-vinted_antiblock = VintedAntiBlock()
-telegram_antiblock = TelegramAntiBlock()
+CATALOG_URL = f"{Config.vinted_url}/api/v2/catalog/items"
+host_breakers = HostBreakers(max_cooldown=getattr(Config, "breaker_max_cooldown", 900))
+vinted_antiblock = VintedAntiBlock(host_breakers)
+topic_availability = TopicAvailability(getattr(Config, "topic_probe_ttl_minutes", 60) * 60)
+# Проверки /topics (sendChatAction) - свой лимит, не расходуют лимиты чата и тем для уведомлений
+topic_probe_bucket = TokenBucket(getattr(Config, "topic_probe_rate", 5),
+                                 capacity=getattr(Config, "topic_probe_concurrency", 5))
+telegram_antiblock = TelegramAntiBlock(TelegramRateLimiter(
+    global_rate=getattr(Config, "telegram_global_rate", 25),
+    chat_rate=getattr(Config, "telegram_chat_rate", 1),
+    group_per_minute=getattr(Config, "telegram_group_per_minute", 20),
+    thread_rate=getattr(Config, "telegram_thread_rate", 1),
+    burst=getattr(Config, "telegram_burst", 3),
+))
+seen_items = SeenItemStore(
+    "vinted_items.bin",
+    legacy_path="vinted_items.txt",
+    compact_threshold=getattr(Config, "seen_compact_threshold", 20000),
+    max_entries=getattr(Config, "seen_max_entries", 0),
+    max_age_seconds=getattr(Config, "seen_max_age_hours", 0) * 3600,
+    topic_floor=getattr(Config, "seen_topic_floor", False),
+    topic_floor_margin=getattr(Config, "seen_topic_floor_margin", 0),
+    flush_every=getattr(Config, "seen_flush_every_items", 64),
+    flush_interval_ms=getattr(Config, "seen_flush_interval_ms", 500),
+    fsync=getattr(Config, "seen_fsync", False),
+)
+topic_watermarks = TopicWatermarks("topic_watermarks.json")
+scan_engine = AsyncScanEngine(
+    max_workers=getattr(Config, "scan_workers", 6),
+    requests_per_second=getattr(Config, "max_requests_per_second", 2.0),
+    per_host=getattr(Config, "max_connections_per_host", 3),
+)
+http_client = get_http_client()
+cookie_cache = get_cookie_cache(budget=scan_engine.budget)
+request_executor = RequestExecutor(
+    max_attempts=getattr(Config, "request_max_attempts", 3),
+    topic_budget=getattr(Config, "request_topic_budget", 10),
+    backoff=getattr(Config, "request_backoff", (1.0, 3.0)),
+    on_attempt=record_attempt,
+)
+transports = {"basic": HTTPTransport("basic", http_client, cookie_cache, vinted_antiblock, scan_engine.request_slot)}
+if ADVANCED_SYSTEM_AVAILABLE:
+    transports["advanced_no_proxy"] = AdvancedTransport("advanced_no_proxy", advanced_system, False, scan_engine.request_slot)
+    transports["advanced_proxy"] = AdvancedTransport("advanced_proxy", advanced_system, True, scan_engine.request_slot)
+request_cache = RequestCache(
+    ttl=getattr(Config, "request_cache_ttl", 2.0),
+    max_entries=getattr(Config, "request_cache_size", 256),
+)
+query_planner = QueryPlanner(getattr(Config, "query_coalescing", "price"))
+scheduler = TopicScheduler(
+    default_interval=default_scan_interval,
+    presets=getattr(Config, "scan_presets", None),
+    adaptive=getattr(Config, "scan_adaptive", False),
+    min_interval=getattr(Config, "scan_min_interval", 4),
+    max_interval=getattr(Config, "scan_max_interval", 120),
+    target_new_per_poll=getattr(Config, "scan_target_new_per_poll", 0.5),
+    half_life=getattr(Config, "scan_rate_half_life_minutes", 60) * 60,
+)
+smtp_client = PooledSMTP(
+    Config.smtp_server,
+    getattr(Config, "smtp_port", 587),
+    Config.smtp_username,
+    Config.smtp_psw,
+    idle_timeout=getattr(Config, "smtp_idle_timeout", 60),
+)
+slack_webhook = SlackWebhook(
+    Config.slack_webhook_url,
+    http_client,
+    rate=getattr(Config, "slack_rate", 1.0),
+)
+notification_outbox = NotificationOutbox(
+    getattr(Config, "item_db_path", "vinted_items.db"),
+    max_attempts=getattr(Config, "notify_max_attempts", 10),
+    backoff_base=getattr(Config, "notify_retry_base", 5),
+    backoff_max=getattr(Config, "notify_retry_max", 900),
+) if getattr(Config, "notify_outbox", True) else None
+notifier = NotificationDispatcher(
+    max_queue=getattr(Config, "notify_queue_size", 500),
+    outbox=notification_outbox,
+    # notified_at в SQLite - время первой успешной доставки, а не постановки в очередь
+    on_delivered=lambda notification, sink: item_store.mark_notified(notification['item_id']),
+)
+item_store = ItemStore(
+    getattr(Config, "item_db_path", "vinted_items.db"),
+    batch_size=getattr(Config, "item_db_batch_size", 200),
+    flush_interval=getattr(Config, "item_db_flush_interval", 1.0),
+)
 
 def load_analyzed_item():
-    try:
-        with open("vinted_items.txt", "r", errors="ignore") as f:
-            for line in f:
-                line = line.strip()
-                if line:
-                    list_analyzed_items.append(line)
-        logging.info(f"Loaded {len(list_analyzed_items)} items")
-    except:
-        logging.info("Starting fresh")
+    seen_items.load()
+    seen_items.set_tracked_topics(Config.topics.keys())
+    topic_watermarks.load()
+    item_store.start()
+    if notification_outbox:
+        notification_outbox.start()
+    logging.info(f"Loaded {len(seen_items)} items")
 
 def save_analyzed_item(item_id):
-    try:
-        with open("vinted_items.txt", "a") as f:
-            f.write(str(item_id) + "\n")
-    except Exception as e:
-        logging.error(f"Save error: {e}")
+    """Сохраняет item_id. Возвращает False, если товар уже был обработан"""
+    return seen_items.add(item_id)
 
 def add_error(error_text, error_type="general"):
     global last_errors, telegram_errors, vinted_errors
@@ -420,58 +513,91 @@ def add_error(error_text, error_type="general"):
         if len(vinted_errors) > 10:
             vinted_errors = vinted_errors[-10:]
 
+def email_body(item_title, item_price, item_url, item_size=None):
+    size_text = f"\n👕 {item_size}" if item_size else ""
+    return f"{item_title}\n🏷️ {item_price}{size_text}\n🔗 {item_url}"
+
+def send_email_message(subject, body):
+    """Письмо через постоянное SMTP-соединение (без подключения и входа на каждое письмо)"""
+    msg = EmailMessage()
+    msg["To"] = Config.smtp_toaddrs
+    msg["From"] = email.utils.formataddr(("Vinted Scanner", Config.smtp_username))
+    msg["Subject"] = subject
+    msg.set_content(body)
+    smtp_client.send(msg)
+
 def send_email(item_title, item_price, item_url, item_image, item_size=None):
     try:
-        msg = EmailMessage()
-        msg["To"] = Config.smtp_toaddrs
-        msg["From"] = email.utils.formataddr(("Vinted Scanner", Config.smtp_username))
-        msg["Subject"] = "Vinted Scanner - New Item"
-        
-        size_text = f"\n👕 {item_size}" if item_size else ""
-        body = f"{item_title}\n🏷️ {item_price}{size_text}\n🔗 {item_url}"
-        msg.set_content(body)
-        
-        with smtplib.SMTP(Config.smtp_server, 587) as server:
-            server.starttls()
-            server.login(Config.smtp_username, Config.smtp_psw)
-            server.send_message(msg)
+        send_email_message("Vinted Scanner - New Item", email_body(item_title, item_price, item_url, item_size))
         logging.info("Email sent")
+        return True
     except Exception as e:
         add_error(f"Email: {str(e)[:30]}")
+        return False
+
+def send_email_digest(notifications):
+    """Все товары окна одним письмом; результат по каждому товару (письмо одно - общий)"""
+    try:
+        body = "\n\n".join(email_body(n['title'], n['price'], n['url'], n['size']) for n in notifications)
+        send_email_message(f"Vinted Scanner - {len(notifications)} New Items", body)
+        logging.info(f"Email digest sent: {len(notifications)} items")
+        return [True] * len(notifications)
+    except Exception as e:
+        add_error(f"Email: {str(e)[:30]}")
+        return [False] * len(notifications)
 
 def send_slack_message(item_title, item_price, item_url, item_image, item_size=None):
     try:
-        size_text = f"\n👕 {item_size}" if item_size else ""
-        message = f"*{item_title}*\n🏷️ {item_price}{size_text}\n🔗 {item_url}"
-        
-        response = requests.post(
-            Config.slack_webhook_url, 
-            json={"text": message},
-            timeout=timeoutconnection
-        )
-        if response.status_code == 200:
+        payload = {
+            "text": f"{item_title} - {item_price}",
+            "blocks": item_blocks(item_title, item_price, item_url, item_image, item_size),
+        }
+        if slack_webhook.post(payload):
             logging.info("Slack sent")
-        else:
-            add_error(f"Slack: {response.status_code}")
+            return True
+        add_error("Slack: send failed")
+        return False
     except Exception as e:
         add_error(f"Slack: {str(e)[:30]}")
+        return False
+
+def send_slack_batch(notifications):
+    """Товары окна одним сообщением Block Kit (или несколькими при лимите блоков);
+    результат по каждому товару - по сообщению, в которое он попал"""
+    results = []
+    try:
+        items = [item_blocks(n['title'], n['price'], n['url'], n['image'], n['size']) for n in notifications]
+        for payload, count in batch_payloads(items, f"🆕 {len(notifications)} новых товаров"):
+            results.extend([slack_webhook.post(payload, count)] * count)
+    except Exception as e:
+        add_error(f"Slack: {str(e)[:30]}")
+    results.extend([False] * (len(notifications) - len(results)))
+    if all(results):
+        logging.info(f"Slack sent: {len(notifications)} items")
+    else:
+        add_error("Slack: batch failed")
+    return results
+
+def topic_label(thread_id):
+    """Имя топика по thread_id (пустая строка, если не найден)"""
+    if thread_id:
+        for name, data in Config.topics.items():
+            if data.get('thread_id') == thread_id:
+                return name
+    return ""
+
+def telegram_caption(item_title, item_price, item_url, item_size=None, thread_id=None):
+    size_text = f"\n👕 {item_size}" if item_size else ""
+    topic_name = topic_label(thread_id)
+    topic_info = f"\n🏷️ {topic_name}" if topic_name else ""
+    return f"<b>{item_title}</b>\n🏷️ {item_price}{size_text}{topic_info}\n🔗 {item_url}"
 
 def send_telegram_message(item_title, item_price, item_url, item_image, item_size=None, thread_id=None):
     try:
-        # АНТИБАН ПАУЗА 1 СЕКУНДА + защита от флуда
-        telegram_antiblock.safe_delay()
-        
-        size_text = f"\n👕 {item_size}" if item_size else ""
-        
-        # Find topic name
-        topic_info = ""
-        if thread_id:
-            for name, data in Config.topics.items():
-                if data.get('thread_id') == thread_id:
-                    topic_info = f"\n🏷️ {name}"
-                    break
-        
-        message = f"<b>{item_title}</b>\n🏷️ {item_price}{size_text}{topic_info}\n🔗 {item_url}"
+        # Лимиты Telegram соблюдаются в telegram_antiblock.post
+        topic_name = topic_label(thread_id)
+        topic_info = f"\n🏷️ {topic_name}" if topic_name else ""
+        message = telegram_caption(item_title, item_price, item_url, item_size, thread_id)
 
         # Try send to topic if thread_id is provided
         if thread_id:
@@ -484,18 +610,17 @@ def send_telegram_message(item_title, item_price, item_url, item_image, item_siz
                     "message_thread_id": thread_id
                 }
                 
-                response = requests.post(
-                    f"https://api.telegram.org/bot{Config.telegram_bot_token}/sendPhoto",
-                    data=params, 
-                    timeout=timeoutconnection
-                )
+                response = telegram_antiblock.post("sendPhoto", params, thread_id)
                 
                 if response.status_code == 200:
                     logging.info(f"✅ Sent to topic {thread_id}")
+                    topic_availability.record(thread_id, True)
                     return True
                 elif response.status_code == 400:
                     # Ошибка 400 может означать, что топики недоступны
                     logging.warning(f"⚠️ Topics not available (400 error), sending to main chat")
+                    if "thread" in response.text.lower():
+                        topic_availability.record(thread_id, False, "thread not found")
                     add_error(f"TG topic disabled: {response.status_code}", "telegram")
                 else:
                     add_error(f"TG topic: {response.status_code}", "telegram")
@@ -513,11 +638,7 @@ def send_telegram_message(item_title, item_price, item_url, item_image, item_siz
             "parse_mode": "HTML",
         }
         
-        response = requests.post(
-            f"https://api.telegram.org/bot{Config.telegram_bot_token}/sendPhoto",
-            data=params,
-            timeout=timeoutconnection
-        )
+        response = telegram_antiblock.post("sendPhoto", params)
         
         if response.status_code == 200:
             if main_chat_marker:
@@ -533,6 +654,103 @@ def send_telegram_message(item_title, item_price, item_url, item_image, item_siz
         add_error(f"TG: {str(e)[:30]}", "telegram")
         return False
 
+def send_telegram_notification(n):
+    return send_telegram_message(n['title'], n['price'], n['url'], n['image'], n['size'], n['thread_id'])
+
+def send_telegram_album(notifications, thread_id):
+    """До 10 товаров одним альбомом (sendMediaGroup), подписи у каждого фото; результат по каждому товару"""
+    media = [{
+        "type": "photo",
+        "media": n['image'],
+        "caption": telegram_caption(n['title'], n['price'], n['url'], n['size'], thread_id),
+        "parse_mode": "HTML",
+    } for n in notifications]
+    params = {"chat_id": Config.telegram_chat_id, "media": json.dumps(media)}
+    if thread_id:
+        params["message_thread_id"] = thread_id
+    response = telegram_antiblock.post("sendMediaGroup", params, thread_id)
+    if response.status_code == 200:
+        topic_availability.record(thread_id, True)
+        logging.info(f"✅ Альбом из {len(notifications)} товаров отправлен (тема {thread_id or 'main'})")
+        return [True] * len(notifications)
+    # Альбом не принят (тема недоступна, битое фото) - по одному с обычным fallback
+    add_error(f"TG album: {response.status_code}", "telegram")
+    return [send_telegram_notification(n) for n in notifications]
+
+def send_telegram_digest(notifications, thread_id):
+    """Компактный текстовый дайджест для большого всплеска (ссылки без фото);
+    результат по каждому товару - по сообщению, в которое попала его строка"""
+    topic_name = topic_label(thread_id)
+    header = f"🔥 <b>{len(notifications)} новых товаров</b>" + (f" · {html.escape(topic_name)}" if topic_name else "")
+    lines = [
+        f"• <a href=\"{html.escape(n['url'])}\">{html.escape(str(n['title']))}</a> — {html.escape(str(n['price']))}"
+        + (f", {html.escape(str(n['size']))}" if n['size'] else "")
+        for n in notifications
+    ]
+    # Лимит сообщения Telegram - 4096 символов
+    messages, current, count = [], header, 0
+    for line in lines:
+        if len(current) + len(line) + 1 > 4000:
+            messages.append((current, count))
+            current, count = header, 0
+        current += "\n" + line
+        count += 1
+    messages.append((current, count))
+
+    results = []
+    for text, count in messages:
+        params = {"chat_id": Config.telegram_chat_id, "text": text, "parse_mode": "HTML",
+                  "disable_web_page_preview": True}
+        if thread_id:
+            params["message_thread_id"] = thread_id
+        response = telegram_antiblock.post("sendMessage", params, thread_id)
+        if response.status_code != 200 and thread_id:
+            add_error(f"TG digest topic: {response.status_code}", "telegram")
+            params.pop("message_thread_id")
+            response = telegram_antiblock.post("sendMessage", params)
+        if response.status_code != 200:
+            add_error(f"TG digest: {response.status_code}", "telegram")
+        results.extend([response.status_code == 200] * count)
+    if all(results):
+        logging.info(f"✅ Дайджест из {len(notifications)} товаров отправлен (тема {thread_id or 'main'})")
+    return results
+
+def send_telegram_batch(notifications):
+    """Всплеск товаров одной темы: альбомы по 10 фото, выше порога - текстовый дайджест;
+    результат по каждому товару"""
+    thread_id = notifications[0]['thread_id']
+    if len(notifications) > getattr(Config, "telegram_digest_threshold", 10):
+        return send_telegram_digest(notifications, thread_id)
+    results = []
+    for start in range(0, len(notifications), 10):
+        chunk = notifications[start:start + 10]
+        if len(chunk) == 1 or not all(n['image'] for n in chunk):
+            results.extend(send_telegram_notification(n) for n in chunk)
+        else:
+            results.extend(send_telegram_album(chunk, thread_id))
+    return results
+
+def start_notifications():
+    """Каналы доставки уведомлений: у каждого своя очередь и свой поток"""
+    if Config.smtp_username and Config.smtp_server:
+        # При email_digest_window > 0 товары окна собираются в одно письмо
+        notifier.add_sink("email", lambda n: send_email(n['title'], n['price'], n['url'], n['image'], n['size']),
+                          send_batch=send_email_digest,
+                          batch_window=getattr(Config, "email_digest_window", 0))
+    if Config.slack_webhook_url:
+        # Товары, найденные в пределах окна, уходят одним сообщением Block Kit
+        notifier.add_sink("slack", lambda n: send_slack_message(n['title'], n['price'], n['url'], n['image'], n['size']),
+                          send_batch=send_slack_batch,
+                          batch_window=getattr(Config, "slack_batch_window", 1.0))
+    if Config.telegram_bot_token and Config.telegram_chat_id:
+        # АНТИБАН TELEGRAM ВКЛЮЧЕН В ФУНКЦИИ
+        # Товары одной темы, найденные в пределах окна, уходят одним альбомом или дайджестом
+        notifier.add_sink("telegram", send_telegram_notification,
+                          send_batch=send_telegram_batch,
+                          batch_window=getattr(Config, "telegram_batch_window", 2.0),
+                          batch_key=lambda n: n['thread_id'])
+    notifier.start()
+
 def should_exclude_item(item, exclude_catalog_ids):
     """ИСПРАВЛЕННАЯ функция фильтрации с детальным логированием"""
     if not exclude_catalog_ids:
@@ -557,73 +775,75 @@ def should_exclude_item(item, exclude_catalog_ids):
     return is_excluded
 
 def scanner_loop():
-    """СУПЕРБЫСТРЫЙ scanner с приоритетными топиками"""
+    """СУПЕРБЫСТРЫЙ scanner с приоритетными топиками (asyncio-движок в отдельном потоке)"""
+    asyncio.run(scanner_main())
+
+def build_scan_plans():
+    """План запросов: пересекающиеся запросы топиков объединяются в один запрос к каталогу"""
+    plans = query_planner.plan({name: topic_query(data)[0] for name, data in Config.topics.items()})
+    schedule = {}
+    for plan in plans:
+        intervals = [Config.topics[m.name]["scan_interval"] for m in plan.members
+                     if "scan_interval" in Config.topics[m.name]]
+        # Запрос плана выполняется, как только наступает срок любого из топиков
+        schedule[plan.name] = {"scan_interval": min(intervals)} if intervals else {}
+    scheduler.configure(schedule)
+    return {plan.name: plan for plan in plans}
+
+async def scanner_main():
+    """Цикл сканирования: запросы плана по дедлайнам, параллельно под общим лимитом"""
     global bot_running
     
+    plans = build_scan_plans()
+    wakeup = asyncio.Event()
+    running_scans = set()
+    
+    breaker = host_breakers.get(CATALOG_URL)
+    
+    async def run_scheduled_scan(plan_name):
+        new_items = None
+        try:
+            new_items = await scan_plan(plans[plan_name], is_priority=scheduler.is_priority(plan_name))
+        except Exception as e:
+            add_error(f"Scanner: {str(e)[:30]}")
+            logging.error(f"Error [{plan_name}]: {e}")
+        finally:
+            # Частота новых товаров учитывается только по успешным запросам
+            if new_items is not None:
+                scheduler.record_outcome(plan_name, new_items)
+            retry_in = breaker.retry_in()
+            if new_items is None and retry_in > 0 and uses_direct_connection():
+                # Хост остывает - топик ждет пробного запроса, а не своего интервала
+                scheduler.reschedule(plan_name, delay=retry_in)
+            else:
+                scheduler.reschedule(plan_name)
+            wakeup.set()
+    
     while bot_running:
         try:
-            logging.info("�� Starting scan cycle")
-            
-            # Get session with dynamic headers
-            session = requests.Session()
-            headers = vinted_antiblock.get_headers()
-            
-            # Get cookies
-            session.post(Config.vinted_url, headers=headers, timeout=timeoutconnection)
-            cookies = session.cookies.get_dict()
+            # Запускаем все запросы, чей дедлайн наступил (при открытой цепи - ни одного,
+            # в half-open - только один пробный)
+            slots = breaker.slots() if uses_direct_connection() else None
+            if slots != 0:
+                for plan_name in scheduler.pop_due(limit=slots):
+                    task = asyncio.create_task(run_scheduled_scan(plan_name))
+                    running_scans.add(task)
+                    task.add_done_callback(running_scans.discard)
             
-            # Anti-block delay
-            vinted_antiblock.delay()
+            # Вытеснение старых ID по политике хранения
+            seen_items.maybe_enforce_retention()
             
-            # PRIORITY SCAN: Scan priority topics more frequently
-            for topic_name in PRIORITY_TOPICS:
-                if not bot_running:
-                    break
-                    
-                if topic_name in Config.topics:
-                    topic_data = Config.topics[topic_name]
-                    if ADVANCED_SYSTEM_AVAILABLE and system_mode in ["auto", "advanced"]:
-                        # Пробуем продвинутую систему (пока без полной интеграции)
-                        logging.info(f"🚀 Продвинутая система активна для {topic_name}")
-                    scan_topic(topic_name, topic_data, cookies, session, is_priority=True)
-                    
-                    # Small delay between priority topics
-                    if bot_running:
-                        time.sleep(random.uniform(0.2, 0.5))
-            
-            # NORMAL SCAN: Scan all topics including priority ones again
-            for topic_name, topic_data in Config.topics.items():
-                if not bot_running:
-                    break
-                    
-                scan_topic(topic_name, topic_data, cookies, session, is_priority=(topic_name in PRIORITY_TOPICS))
-                
-                # Small delay between topics
-                if bot_running and len(Config.topics) > 1:
-                    time.sleep(random.uniform(0.3, 1.0))
-
-            # СУПЕРБЫСТРЫЕ интервалы между циклами
-            if bot_running:
-                if scan_mode == "fast":
-                    # Fast mode: Priority topics every 5-7s, normal every 10-15s
-                    delay = random.uniform(5, 7)  # СУПЕРБЫСТРО для priority
-                    logging.info(f"🐰 FAST: wait {delay:.0f}s")
-                else:
-                    # Slow mode: Priority topics every 25-35s, normal every 45-60s  
-                    delay = random.uniform(25, 35)  # Более медленно для стабильности
-                    logging.info(f"🐌 SLOW: wait {delay:.0f}s")
-                
-                # УЛУЧШЕННАЯ СИСТЕМА ЗАДЕРЖЕК ПРИ ОШИБКАХ
-                if len(last_errors) > 0:
-                    # Если есть ошибки, увеличиваем задержку
-                    error_delay = min(len(last_errors) * 5, 30)  # Максимум 30 секунд
-                    delay += error_delay
-                    logging.warning(f"⚠️ Увеличена задержка из-за ошибок: +{error_delay}s")
-                
-                # НОВАЯ ЛОГИКА: Автоматическое самовосстановление в каждом цикле
-                auto_recovery_system()
-                
-                time.sleep(delay)
+            # Спим ровно до ближайшего дедлайна (или до завершения сканирования)
+            deadline = scheduler.next_deadline()
+            timeout = 5.0 if deadline is None else min(5.0, max(0.0, deadline - time.time()))
+            if slots == 0:
+                # Цепь открыта: простаиваем до пробного запроса (или до завершения идущего)
+                timeout = min(5.0, max(0.1, breaker.retry_in()))
+            wakeup.clear()
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
                 
         except Exception as e:
             add_error(f"Scanner: {str(e)[:30]}")
@@ -633,31 +853,15 @@ def scanner_loop():
             if "Conflict: terminated by other getUpdates request" in str(e):
                 logging.warning("⚠️ Обнаружен конфликт Telegram ботов")
                 logging.info("🔄 Ожидание 30 секунд для разрешения конфликта...")
-                time.sleep(30)
+                await asyncio.sleep(30)
             elif bot_running:
-                time.sleep(20)
-
-def scan_topic(topic_name, topic_data, cookies, session, is_priority=False):
-    """Сканирование одного топика с трехуровневой системой защиты"""
-    global current_system, last_scan_time
-    
-    # НОВАЯ ЛОГИКА: Проверка самовосстановления перед каждым сканированием
-    auto_recovery_system()
-    
-    # Проверяем, не сканировали ли мы этот топик слишком недавно
-    current_time = time.time()
-    if topic_name in last_scan_time:
-        time_since_last_scan = current_time - last_scan_time[topic_name]
-        if time_since_last_scan < min_scan_interval:
-            logging.debug(f"⏰ Skipping {topic_name} - scanned {time_since_last_scan:.1f}s ago")
-            return
-    
-    # Обновляем время последнего сканирования
-    last_scan_time[topic_name] = current_time
-    
-    priority_mark = "🔥" if is_priority else ""
-    logging.info(f"Scanning{priority_mark}: {topic_name}")
+                await asyncio.sleep(20)
     
+    if running_scans:
+        await asyncio.gather(*running_scans, return_exceptions=True)
+
+def topic_query(topic_data):
+    """Параметры запроса, исключаемые каталоги и thread_id топика"""
     # Поддержка старой и новой структуры конфигурации
     if "query" in topic_data:
         # Старая структура
@@ -677,194 +881,162 @@ def scan_topic(topic_name, topic_data, cookies, session, is_priority=False):
         }
         exclude_catalog_ids = ""
         thread_id = None
+    return params, exclude_catalog_ids, thread_id
+
+async def scan_plan(plan, is_priority=False):
+    """Один запрос к каталогу на группу топиков: возвращает число новых товаров (None - нет выдачи)"""
+    # НОВАЯ ЛОГИКА: Проверка самовосстановления перед каждым сканированием
+    auto_recovery_system()
     
+    priority_mark = "🔥" if is_priority else ""
+    logging.info(f"Scanning{priority_mark}: {plan.name}")
+    
+    # Запрос выполняется в пуле потоков - другие топики сканируются параллельно
+    data, used_system = await scan_engine.run_blocking(fetch_topic_data, plan.name, plan.params)
+    if not (data and "items" in data):
+        logging.warning(f"No items: {plan.name}")
+        return None
+    
+    items = await fetch_gap_pages(plan, data["items"])
+    
+    # Раздача общей выдачи топикам плана локальными фильтрами
+    new_count = 0
+    for topic_name, items in plan.route(items).items():
+        _, exclude_catalog_ids, thread_id = topic_query(Config.topics[topic_name])
+        # Обработка пишет в outbox (SQLite) и файл отметок - вне цикла событий
+        new_items = await asyncio.to_thread(process_topic_items, topic_name, {"items": items}, used_system,
+                                            exclude_catalog_ids, thread_id, is_priority)
+        new_count += new_items or 0
+    return new_count
+
+def is_gap_page(items, watermark=0, excluded=lambda item: False):
+    """Все обычные (не продвигаемые) товары страницы новые - за страницей могут быть пропущенные.
+    Товары не выше отметки уже просмотрены; исключенные никогда не попадают в seen_items,
+    поэтому в проверке не участвуют"""
+    regular = [item for item in items if not item.get("promoted") and not excluded(item)]
+    return bool(regular) and all(
+        int(item["id"]) > watermark and str(item["id"]) not in seen_items for item in regular)
+
+async def fetch_gap_pages(plan, items):
+    """Дозагрузка следующих страниц, если новых товаров больше, чем per_page (до gap_max_pages страниц)"""
+    max_pages = getattr(Config, "gap_max_pages", 3)
+    marks = [topic_watermarks.get(m.name) for m in plan.members]
+    # Первое сканирование топика (нет отметки) - не разрыв, а начальная загрузка
+    if max_pages <= 1 or not any(marks):
+        return items
+    # Ниже наименьшей отметки товары просмотрены всеми топиками плана
+    watermark = min(mark for mark in marks if mark)
+    # Товар исключен, только если его исключают все топики плана
+    excludes = [topic_query(Config.topics[m.name])[1] for m in plan.members]
+    excluded = lambda item: all(should_exclude_item(item, ids) for ids in excludes)
+    if not is_gap_page(items, watermark, excluded):
+        return items
+    
+    per_page = int(plan.params.get("per_page") or len(items) or 1)
+    page = int(plan.params.get("page") or 1)
+    all_items = list(items)
+    known_ids = {item["id"] for item in items}
+    pages = 1
+    while pages < max_pages and bot_running:
+        page += 1
+        params = dict(plan.params, page=str(page))
+        data, _ = await scan_engine.run_blocking(fetch_topic_data, plan.name, params)
+        page_items = [item for item in (data or {}).get("items", []) if item["id"] not in known_ids]
+        pages += 1
+        all_items.extend(page_items)
+        known_ids.update(item["id"] for item in page_items)
+        # Дошли до уже просмотренных товаров или до конца выдачи
+        if len(page_items) < per_page or not is_gap_page(page_items, watermark, excluded):
+            break
+    
+    for member in plan.members:
+        topic_watermarks.record_gap(member.name, pages - 1)
+    logging.info(f"🕳️ [{plan.name}] Все {len(items)} товаров новые - догружено страниц: {pages - 1}, товаров: {len(all_items) - len(items)}")
+    return all_items
+
+def fetch_topic_data(topic_name, params):
+    """Запрос каталога с дедупликацией: одинаковые запросы в полете и за последние секунды - один ответ"""
+    return request_cache.fetch(
+        CATALOG_URL, params,
+        lambda: fetch_catalog_guarded(topic_name, params),
+        cache_if=lambda result: bool(result[0]),
+    )
+
+def uses_direct_connection():
+    """Все транспорты текущей системы идут с нашего IP (нет обхода через прокси)"""
+    return all(transport.direct for transport in transport_chain(current_system))
+
+def fetch_catalog_guarded(topic_name, params):
+    """Запрос каталога через circuit breaker хоста: при открытой цепи запросы с нашего IP
+    не отправляются, остаются только транспорты через прокси"""
     # Проверяем необходимость переключения системы
     if should_switch_system():
         logging.info(f"🔄 СИСТЕМА ПЕРЕКЛЮЧЕНА НА: {current_system.upper()}")
     
-    data = None
     used_system = current_system
-    
-    # ТРЕХУРОВНЕВАЯ СИСТЕМА ЗАЩИТЫ
-    if current_system == "basic":
-        # БАЗОВАЯ СИСТЕМА
-        logging.info(f"🛡️ [{topic_name}] Запрос через БАЗОВУЮ систему")
-        
-        topic_headers = vinted_antiblock.get_headers()
-        max_retries = 3
-        
-        for attempt in range(max_retries):
-            try:
-                response = requests.get(
-                    f"{Config.vinted_url}/api/v2/catalog/items", 
-                    params=params, 
-                    cookies=cookies, 
-                    headers=topic_headers,
-                    timeout=timeoutconnection
-                )
-
-                if vinted_antiblock.handle_errors(response):
-                    if attempt < max_retries - 1:
-                        logging.info(f"🔄 Повторная попытка {attempt + 1}/{max_retries}")
-                        time.sleep(random.uniform(2, 5))
-                        continue
-                    else:
-                        logging.error(f"❌ Все попытки исчерпаны для {topic_name}")
-                        update_system_stats("basic", success=False)
-                        return
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    update_system_stats("basic", success=True)
-                    break
-                else:
-                    logging.error(f"Error {response.status_code}: {topic_name}")
-                    add_error(f"HTTP {response.status_code}", "vinted")
-                    update_system_stats("basic", success=False)
-                    
-                    if attempt < max_retries - 1:
-                        time.sleep(random.uniform(2, 5))
-                        continue
-                    else:
-                        return
-                        
-            except Exception as e:
-                logging.error(f"❌ Ошибка запроса: {e}")
-                update_system_stats("basic", success=False)
-                if attempt < max_retries - 1:
-                    time.sleep(random.uniform(2, 5))
-                    continue
-                else:
-                    add_error(f"Request error: {str(e)[:30]}", "vinted")
-                    return
-    
-    elif current_system == "advanced_no_proxy":
-        # ПРОДВИНУТАЯ СИСТЕМА БЕЗ ПРОКСИ
-        if ADVANCED_SYSTEM_AVAILABLE:
-            try:
-                logging.info(f"🚀 [{topic_name}] Запрос через ПРОДВИНУТУЮ систему БЕЗ ПРОКСИ")
-                
-                # Настраиваем продвинутую систему на работу без прокси
-                advanced_system.proxy_mode = "disabled"
-                advanced_system.current_proxy = None
-                
-                url = f"{Config.vinted_url}/api/v2/catalog/items"
-                data = advanced_system.make_http_request(url, params, cookies)
-                
-                if data and "items" in data:
-                    logging.info(f"✅ ПРОДВИНУТАЯ БЕЗ ПРОКСИ: Found {len(data.get('items', []))} items for {topic_name}")
-                    update_system_stats("advanced_no_proxy", success=True)
-                else:
-                    logging.warning(f"⚠️ Продвинутая система без прокси не вернула данные для {topic_name}")
-                    update_system_stats("advanced_no_proxy", success=False)
-                    
-            except Exception as e:
-                logging.error(f"❌ Ошибка продвинутой системы без прокси: {e}")
-                update_system_stats("advanced_no_proxy", success=False)
-        
-        # Fallback на базовую систему (временный, не меняем current_system)
-        if not data:
-            logging.info(f"🛡️ [{topic_name}] ВРЕМЕННЫЙ fallback на БАЗОВУЮ систему")
-            
-            topic_headers = vinted_antiblock.get_headers()
-            max_retries = 3
-            
-            for attempt in range(max_retries):
-                try:
-                    response = requests.get(
-                        f"{Config.vinted_url}/api/v2/catalog/items", 
-                        params=params, 
-                        cookies=cookies, 
-                        headers=topic_headers,
-                        timeout=timeoutconnection
-                    )
-
-                    if vinted_antiblock.handle_errors(response):
-                        if attempt < max_retries - 1:
-                            logging.info(f"🔄 Повторная попытка {attempt + 1}/{max_retries}")
-                            time.sleep(random.uniform(2, 5))
-                            continue
-                        else:
-                            logging.error(f"❌ Все попытки исчерпаны для {topic_name}")
-                            return
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        logging.info(f"✅ ВРЕМЕННЫЙ FALLBACK: Успешный запрос через базовую систему")
-                        break
-                    else:
-                        logging.error(f"Error {response.status_code}: {topic_name}")
-                        add_error(f"HTTP {response.status_code}", "vinted")
-                        
-                        if attempt < max_retries - 1:
-                            time.sleep(random.uniform(2, 5))
-                            continue
-                        else:
-                            return
-                            
-                except Exception as e:
-                    logging.error(f"❌ Ошибка запроса: {e}")
-                    if attempt < max_retries - 1:
-                        time.sleep(random.uniform(2, 5))
-                        continue
-                    else:
-                        add_error(f"Request error: {str(e)[:30]}", "vinted")
-                        return
-    
-    elif current_system == "advanced_proxy":
-        # ПРОДВИНУТАЯ СИСТЕМА С ПРОКСИ
-        if ADVANCED_SYSTEM_AVAILABLE:
-            try:
-                logging.info(f"🚀 [{topic_name}] Запрос через ПРОДВИНУТУЮ систему С ПРОКСИ")
-                
-                # Настраиваем продвинутую систему на работу с прокси
-                advanced_system.proxy_mode = "enabled"
-                if not advanced_system.current_proxy:
-                    advanced_system._rotate_proxy()
-                
-                url = f"{Config.vinted_url}/api/v2/catalog/items"
-                data = advanced_system.make_http_request(url, params, cookies)
-                
-                if data and "items" in data:
-                    logging.info(f"✅ ПРОДВИНУТАЯ С ПРОКСИ: Found {len(data.get('items', []))} items for {topic_name}")
-                    update_system_stats("advanced_proxy", success=True)
-                else:
-                    logging.warning(f"⚠️ Продвинутая система с прокси не вернула данные для {topic_name}")
-                    update_system_stats("advanced_proxy", success=False)
-                    
-            except Exception as e:
-                logging.error(f"❌ Ошибка продвинутой системы с прокси: {e}")
-                update_system_stats("advanced_proxy", success=False)
-        
-        # Fallback на продвинутую без прокси (временный, не меняем current_system)
-        if not data:
-            logging.info(f"🛡️ [{topic_name}] ВРЕМЕННЫЙ fallback на ПРОДВИНУТУЮ БЕЗ ПРОКСИ")
-            
-            if ADVANCED_SYSTEM_AVAILABLE:
-                try:
-                    # Настраиваем продвинутую систему на работу без прокси
-                    advanced_system.proxy_mode = "disabled"
-                    advanced_system.current_proxy = None
-                    
-                    url = f"{Config.vinted_url}/api/v2/catalog/items"
-                    data = advanced_system.make_http_request(url, params, cookies)
-                    
-                    if data and "items" in data:
-                        logging.info(f"✅ ВРЕМЕННЫЙ FALLBACK: Found {len(data.get('items', []))} items через продвинутую без прокси")
-                    else:
-                        logging.warning(f"⚠️ Временный fallback не вернул данные для {topic_name}")
-                        
-                except Exception as e:
-                    logging.error(f"❌ Ошибка временного fallback: {e}")
-    
-    # Обработка полученных данных
+    chain = transport_chain(used_system)
+    breaker = host_breakers.get(CATALOG_URL)
+    admission = breaker.allow() if any(transport.direct for transport in chain) else None
+    if admission is None:
+        chain = [transport for transport in chain if not transport.direct]
+    if not chain:
+        logging.info(f"⛔ [{topic_name}] Цепь {breaker.name} открыта - запрос отложен")
+        return None, used_system
+    try:
+        data, transport_name = fetch_catalog(topic_name, params, chain)
+        if data and transports[transport_name].direct:
+            breaker.record_success(admission)
+        return data, used_system
+    finally:
+        breaker.release(admission)
+
+def transport_chain(system_name):
+    """Транспорты системы: основной и временный fallback (current_system не меняется)"""
+    if not ADVANCED_SYSTEM_AVAILABLE or system_name == "basic":
+        return [transports["basic"]]
+    if system_name == "advanced_no_proxy":
+        return [transports["advanced_no_proxy"], transports["basic"]]
+    return [transports["advanced_proxy"], transports["advanced_no_proxy"]]
+
+def fetch_catalog(topic_name, params, chain):
+    """Запрос каталога через цепочку транспортов (блокирующий, выполняется в пуле);
+    возвращает данные и имя транспорта, который их получил"""
+    logging.info(f"🛡️ [{topic_name}] Запрос: {' → '.join(t.name for t in chain)}")
+    data, transport_name = request_executor.execute(topic_name, chain, CATALOG_URL, params)
+    if data and transport_name != current_system:
+        logging.info(f"✅ ВРЕМЕННЫЙ FALLBACK: Успешный запрос через {transport_name}")
+    return data, transport_name
+
+def process_topic_items(topic_name, data, used_system, exclude_catalog_ids, thread_id, is_priority=False):
+    """Обработка выдачи топика: отметки, исключения, дедупликация и уведомления"""
     if data and "items" in data:
+        new_count = 0
         logging.info(f"📊 ИСПОЛЬЗУЕТСЯ СИСТЕМА: {used_system.upper()}")
         logging.info(f"Система [{used_system}]: Found {len(data['items'])} items")
         
-        for item in data["items"]:
+        # Окно ID топика - для вытеснения старых ID из хранилища
+        seen_items.note_topic_window(topic_name, [item.get("id") for item in data["items"]])
+        
+        # Отметка топика: выдача newest_first, все что не выше отметки - уже просмотрено
+        watermark = topic_watermarks.get(topic_name)
+        
+        for index, item in enumerate(data["items"]):
             if not bot_running:
                 break
+            
+            if watermark and int(item["id"]) <= watermark:
+                # Продвигаемые товары могут стоять выше по выдаче, поэтому выходим только на обычных
+                if item.get("promoted"):
+                    continue
+                stale_count = len(data["items"]) - index
+                topic_watermarks.record_early_exit(stale_count)
+                logging.info(f"⏹️ [{topic_name}] Отметка {watermark} достигнута, пропущено старых: {stale_count}")
+                break
+            
+            # Отметку поднимают только обычные товары: продвигаемый товар с большим ID
+            # не должен перескочить еще не просмотренные обычные
+            if not item.get("promoted"):
+                topic_watermarks.update(topic_name, item["id"])
                 
             # ИСПРАВЛЕННАЯ проверка исключений
             if should_exclude_item(item, exclude_catalog_ids):
@@ -874,7 +1046,7 @@ def scan_topic(topic_name, topic_data, cookies, session, is_priority=False):
             item_url = item["url"]
             
             # Проверяем уникальность по ID и URL
-            if item_id not in list_analyzed_items:
+            if item_id not in seen_items:
                 item_title = item["title"]
                 item_price = f'{item["price"]["amount"]} {item["price"]["currency_code"]}'
                 item_image = item["photo"]["full_size_url"]
@@ -883,43 +1055,66 @@ def scan_topic(topic_name, topic_data, cookies, session, is_priority=False):
                 priority_log = "🔥 PRIORITY " if is_priority else ""
                 logging.info(f"🆕 {priority_log}NEW: {item_title} - {item_price} (ID: {item_id})")
 
-                # НЕМЕДЛЕННО сохраняем item_id, чтобы избежать дублирования
-                list_analyzed_items.append(item_id)
-                save_analyzed_item(item_id)
-                logging.info(f"💾 Saved item_id: {item_id}")
-
-                # Send notifications
-                if Config.smtp_username and Config.smtp_server:
-                    send_email(item_title, item_price, item_url, item_image, item_size)
+                # История товаров в SQLite (пишется в фоне); раньше уведомления - чтобы
+                # отметка доставки (notified_at) шла в очереди записи после самого товара
+                item_store.record(item_record(item, topic_name, thread_id))
 
-                if Config.slack_webhook_url:
-                    send_slack_message(item_title, item_price, item_url, item_image, item_size)
+                # Уведомления сначала пишутся в outbox (до отметки товара), затем уходят
+                # в очередь диспетчера - сканер сразу продолжает опрос
+                notifier.dispatch({
+                    'item_id': item_id,
+                    'topic': topic_name,
+                    'title': item_title,
+                    'price': item_price,
+                    'url': item_url,
+                    'image': item_image,
+                    'size': item_size,
+                    'thread_id': thread_id,
+                })
 
-                if Config.telegram_bot_token and Config.telegram_chat_id:
-                    # АНТИБАН TELEGRAM ВКЛЮЧЕН В ФУНКЦИИ
-                    success = send_telegram_message(item_title, item_price, item_url, item_image, item_size, thread_id)
-                    
-                    if not success:
-                        logging.warning(f"⚠️ Failed to send to Telegram: {item_title}")
+                # Сохраняем item_id, чтобы избежать дублирования
+                save_analyzed_item(item_id)
+                new_count += 1
+                logging.info(f"💾 Saved item_id: {item_id}")
             else:
                 logging.info(f"🔄 SKIP: Already processed - {item.get('title', 'Unknown')} (ID: {item_id})")
+        
+        topic_watermarks.save()
+        return new_count
     else:
         logging.warning(f"No items: {topic_name}")
+        return None
 
 # Telegram bot commands
 async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     global bot_running, scan_mode, last_errors, telegram_errors, vinted_errors
     status = "🟢 Running" if bot_running else "🔴 Stopped"
-    items_count = len(list_analyzed_items)
+    items_count = len(seen_items)
     
     mode_emoji = "🐰" if scan_mode == "fast" else "🐌"
-    if scan_mode == "fast":
-        mode_interval = "5-7s priority, 10-15s normal"
-    else:
-        mode_interval = "15-20s priority, 30-45s normal"
+    mode_interval = scheduler.describe_preset()
     mode_info = f"\n{mode_emoji} Mode: {scan_mode} ({mode_interval})"
+    sched_stats = scheduler.get_stats()
+    mode_info += f"\n⏰ Планировщик: {sched_stats['scans']} сканирований, опоздание {sched_stats['avg_lateness']:.2f}s"
+    engine_stats = scan_engine.get_stats()
+    mode_info += f"\n⚙️ Движок: {engine_stats['requests']} запросов, одновременно {engine_stats['in_flight']}"
+    mode_info += f" (макс {engine_stats['max_in_flight']}, потоков {engine_stats['workers']}, на хост {engine_stats['per_host']})"
+    mode_info += f", лимит {engine_stats['requests_per_second']:g}/с, ожиданий бюджета {engine_stats['budget_waits']}"
+    plan_stats = query_planner.get_stats()
+    mode_info += f"\n🔗 Объединение запросов ({plan_stats['mode']}): {plan_stats['topics']} топиков → {plan_stats['fetches']} запросов"
+    if sched_stats['adaptive']:
+        mode_info += f"\n📈 Адаптивные интервалы (новых/ч → интервал):"
+        for name, rate in sorted(scheduler.get_rates().items(), key=lambda kv: kv[1]['interval']):
+            mode_info += f"\n   {name[:25]}: {rate['new_per_hour']:.1f} → {rate['interval']:.0f}s"
     
     anti_info = f"\n📱 Telegram messages: {telegram_antiblock.message_count}"
+    if webhook_receiver is not None:
+        hook = webhook_receiver.get_stats()
+        anti_info += f"\n🪝 Webhook: получено {hook['received']}, отклонено {hook['rejected']}, ошибок {hook['errors']}"
+    tg_limits = telegram_antiblock.limiter.get_stats()
+    anti_info += f"\n🚦 TG лимитер: ожидание {tg_limits['avg_wait']:.2f}s, 429: {tg_limits['flood_waits']}"
+    if tg_limits['blocked_chats']:
+        anti_info += f" (пауза {max(tg_limits['blocked_chats'].values()):.0f}s)"
     
     # ТРЕХУРОВНЕВАЯ СИСТЕМА СТАТУСА
     system_display = current_system.upper()
@@ -947,6 +1142,45 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     anti_info += f"\n🔹 Базовая система: {basic_success}/{basic_requests}"
     anti_info += f"\n🔹 Продвинутая без прокси: {advanced_no_proxy_success}/{advanced_no_proxy_requests}"
     anti_info += f"\n🔹 Продвинутая с прокси: {advanced_proxy_success}/{advanced_proxy_requests}"
+    cookie_stats = cookie_cache.get_stats()
+    cookie_age = f"{cookie_stats['age']/60:.0f} мин" if cookie_stats['age'] is not None else "нет"
+    anti_info += f"\n🍪 Cookies: обновлений {cookie_stats['refreshes']} (сбросов по 401: {cookie_stats['invalidations']}), "
+    anti_info += f"из кэша {cookie_stats['hits']} (~{cookie_stats['saved_per_hour']:.0f}/ч), возраст {cookie_age}"
+    for host, breaker_stats in host_breakers.get_stats().items():
+        breaker_emoji = {"closed": "🟢", "open": "🔴", "half_open": "🟡"}.get(breaker_stats['state'], "⚪")
+        anti_info += f"\n{breaker_emoji} Цепь {host}: {breaker_stats['state']} {breaker_stats['time_in_state']/60:.1f} мин"
+        if breaker_stats['retry_in']:
+            anti_info += f", проба через {breaker_stats['retry_in']:.0f}s ({breaker_stats['last_reason']})"
+        anti_info += f", открытий {breaker_stats['opens']}"
+    exec_stats = request_executor.get_stats()
+    anti_info += f"\n🎯 Исполнитель: {exec_stats['successes']}/{exec_stats['executions']}, бюджет исчерпан {exec_stats['budget_exhausted']}"
+    for name, latency in exec_stats['latency'].items():
+        anti_info += f"\n   {name}: {latency['attempts']} попыток, {latency['avg']*1000:.0f}мс (макс {latency['max']*1000:.0f}мс)"
+    for sink_name, sink in notifier.get_stats().items():
+        anti_info += f"\n📬 {sink_name}: очередь {sink['depth']}, отправлено {sink['sent']}, ошибок {sink['failed']}, отброшено {sink['dropped']}"
+        anti_info += f", задержка {sink['avg_latency']:.1f}s (макс {sink['max_latency']:.1f}s)"
+        if sink['batches']:
+            anti_info += f", пачек {sink['batches']} ({sink['batched']} товаров, макс {sink['max_batch']})"
+    if slack_webhook.messages or slack_webhook.failed:
+        slack_stats = slack_webhook.get_stats()
+        anti_info += f"\n💬 Slack: сообщений {slack_stats['messages']} ({slack_stats['items_per_message']:.1f} товаров в среднем)"
+        anti_info += f", 429: {slack_stats['throttled']}, пачка {slack_stats['avg_latency']*1000:.0f}мс (макс {slack_stats['max_latency']*1000:.0f}мс)"
+    if smtp_client.sent:
+        smtp_stats = smtp_client.get_stats()
+        anti_info += f"\n📧 SMTP: писем {smtp_stats['sent']}, соединений {smtp_stats['connections']}"
+        anti_info += f", переподключений {smtp_stats['reconnects']}, {smtp_stats['avg_latency']*1000:.0f}мс/письмо"
+    if notification_outbox:
+        box = await asyncio.to_thread(notification_outbox.get_stats)
+        anti_info += f"\n📮 Outbox: подтверждено {box['acked']}, повторов {box['retries']}, не доставлено {box['dead']}"
+        if box['pending']:
+            anti_info += ", ожидают: " + ", ".join(f"{name} {count}" for name, count in box['pending'].items())
+        if box['replayed']:
+            anti_info += f", после перезапуска {box['replayed']}"
+    cache_stats = request_cache.get_stats()
+    anti_info += f"\n♻️ Кэш запросов: попаданий {cache_stats['hits']}, совмещено {cache_stats['shared']}, промахов {cache_stats['misses']}"
+    pool = http_client.get_stats()
+    anti_info += f"\n🔌 HTTP пул: {pool['requests']} запросов, {pool['connections_opened']} соединений, "
+    anti_info += f"переиспользовано {pool['reuse_rate']*100:.0f}%, задержка {pool['avg_latency']*1000:.0f}мс"
     
     # Информация о продвинутой системе
     if ADVANCED_SYSTEM_AVAILABLE:
@@ -988,9 +1222,39 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if last_errors:
         error_info += f"\n❌ Recent:\n" + "\n".join(last_errors[-2:])
     
-    response = f"{status}\n📊 Items: {items_count}{mode_info}{anti_info}{error_info}"
+    # Политика хранения просмотренных ID
+    retention = seen_items.get_retention_policy()
+    retention_info = f"\n🧹 Хранение ID: max {retention['max_entries'] or '∞'}"
+    retention_info += f", возраст {retention['max_age_hours']:.0f}ч" if retention['max_age_hours'] else ", возраст ∞"
+    if retention['topic_floor']:
+        retention_info += f", порог по топикам ({retention['topics_reported']}/{retention['topics_tracked']}, запас {retention['topic_floor_margin']})"
+    retention_info += f"\n   Порог ID: {retention['floor']}, вытеснено: {retention['evicted']}"
+    db_stats = item_store.get_stats()
+    retention_info += f"\n🗄️ SQLite: записано {db_stats['inserted']}, очередь {db_stats['queued']}, пакет {db_stats['avg_batch_ms']:.1f}мс"
+    try:
+        # Чтение SQLite - вне цикла событий бота
+        found_today = await asyncio.to_thread(item_store.count_by_topic, time.time() - 86400)
+    except Exception as e:
+        found_today = {}
+        logging.warning(f"⚠️ Ошибка чтения {item_store.path}: {e}")
+    if found_today:
+        retention_info += f"\n🆕 Найдено за 24ч: {sum(found_today.values())}"
+        retention_info += "".join(f"\n   {name[:25]}: {count}" for name, count in
+                                  sorted(found_today.items(), key=lambda kv: -kv[1])[:3])
+    marks = topic_watermarks.get_stats()
+    retention_info += f"\n📍 Отметки топиков: {marks['topics']}, ранних выходов: {marks['early_exits']}, пропущено: {marks['skipped_items']}"
+    if marks['gap_events']:
+        top_gaps = sorted(marks['gap_events'].items(), key=lambda kv: -kv[1])[:3]
+        retention_info += f"\n🕳️ Разрывы выдачи: {sum(marks['gap_events'].values())}, догружено страниц: {marks['gap_pages']}"
+        retention_info += "".join(f"\n   {name[:25]}: {count}" for name, count in top_gaps)
+    
+    response = f"{status}\n📊 Items: {items_count}{retention_info}{mode_info}{anti_info}{error_info}"
     await update.message.reply_text(response)
 
+def read_log_lines():
+    with open("vinted_scanner.log", "r", encoding="utf-8", errors="ignore") as f:
+        return f.readlines()
+
 async def log_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """ИСПРАВЛЕННАЯ команда /log"""
     try:
@@ -998,8 +1262,7 @@ async def log_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await update.message.reply_text("📝 Лог файл не найден")
             return
             
-        with open("vinted_scanner.log", "r", encoding="utf-8", errors="ignore") as f:
-            lines = f.readlines()
+        lines = await asyncio.to_thread(read_log_lines)
             
         if not lines:
             await update.message.reply_text("📝 Лог файл пуст")
@@ -1018,19 +1281,18 @@ async def log_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(f"❌ Ошибка чтения: {str(e)[:100]}")
 
 async def restart_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    global bot_running, scanner_thread, list_analyzed_items
+    global bot_running, scanner_thread
     await update.message.reply_text("🔄 Restarting...")
     
     bot_running = False
     if scanner_thread:
-        scanner_thread.join(timeout=5)
+        await asyncio.to_thread(scanner_thread.join, 5)
     
-    list_analyzed_items.clear()
-    try:
-        with open("vinted_items.txt", "w") as f:
-            f.write("")
-    except:
-        pass
+    seen_items.clear()
+    topic_watermarks.clear()
+    # Иначе ключ (товар, канал) в outbox подавит повторные уведомления после сброса
+    if notification_outbox:
+        await asyncio.to_thread(notification_outbox.forget_delivered)
     
     await asyncio.sleep(1)
     
@@ -1044,15 +1306,17 @@ async def fast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Команда /fast - быстрый режим сканирования"""
     global scan_mode
     scan_mode = "fast"
+    scheduler.set_preset("fast")
     logging.info("🐰 Переключение в FAST режим")
-    await update.message.reply_text("🐰 FAST mode: 5-7s priority, 10-15s normal")
+    await update.message.reply_text(f"🐰 FAST mode: {scheduler.describe_preset('fast')}")
 
 async def slow_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Команда /slow - медленный режим сканирования"""
     global scan_mode
     scan_mode = "slow"
+    scheduler.set_preset("slow")
     logging.info("🐌 Переключение в SLOW режим")
-    await update.message.reply_text("🐌 SLOW mode: 25-35s priority, 45-60s normal")
+    await update.message.reply_text(f"🐌 SLOW mode: {scheduler.describe_preset('slow')}")
 
 
 
@@ -1068,7 +1332,7 @@ async def reset_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # Сброс продвинутой системы
         if ADVANCED_SYSTEM_AVAILABLE:
             try:
-                advanced_system.refresh_session()
+                await asyncio.to_thread(advanced_system.refresh_session)
                 advanced_system.consecutive_errors = 0
                 advanced_system.current_delay = 1.0
                 # Сброс к режиму auto без прокси
@@ -1248,7 +1512,8 @@ async def recovery_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 failed_proxies = []
                 
                 for proxy in advanced_system.proxies:
-                    if advanced_system._test_proxy(proxy):
+                    # Проверка прокси - сетевой запрос, выполняется вне цикла событий бота
+                    if await asyncio.to_thread(advanced_system._test_proxy, proxy):
                         working_proxies.append(f"{proxy['host']}:{proxy['port']}")
                         if proxy not in advanced_system.proxy_whitelist:
                             advanced_system.proxy_whitelist.append(proxy)
@@ -1451,39 +1716,50 @@ async def traffic_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     await telegram_antiblock.safe_send_message(update.effective_chat.id, message)
 
+async def probe_topic(bot, thread_id, semaphore):
+    """Проверка темы через sendChatAction - без тестового сообщения в тему"""
+    async with semaphore:
+        try:
+            await topic_probe_bucket.acquire_async()
+            await bot.send_chat_action(chat_id=Config.telegram_chat_id, action="typing", message_thread_id=thread_id)
+            topic_availability.record(thread_id, True, probe=True)
+        except BadRequest as e:
+            topic_availability.record(thread_id, False, str(e)[:40], probe=True)
+        except RetryAfter as e:
+            telegram_antiblock.limiter.penalize(Config.telegram_chat_id, telegram_retry_after(e))
+        except Exception as e:
+            logging.warning(f"⚠️ Проверка темы {thread_id}: {str(e)[:60]}")
+
 async def topics_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Команда /topics - проверка доступности топиков"""
     message = "🏷️ ПРОВЕРКА ДОСТУПНОСТИ ТОПИКОВ:\n\n"
     
-    # Проверяем каждый топик
+    # Заново проверяются только темы без свежего состояния (из отправок или прошлых проверок)
+    thread_ids = [topic_data.get('thread_id') for topic_data in Config.topics.values()]
+    to_probe = topic_availability.stale(thread_ids)
+    if to_probe:
+        semaphore = asyncio.Semaphore(getattr(Config, "topic_probe_concurrency", 5))
+        await asyncio.gather(*(probe_topic(context.bot, thread_id, semaphore) for thread_id in to_probe))
+    
     for topic_name, topic_data in Config.topics.items():
         thread_id = topic_data.get('thread_id')
-        if thread_id:
-            try:
-                # Пробуем отправить тестовое сообщение в топик
-                test_params = {
-                    "chat_id": Config.telegram_chat_id,
-                    "text": f"🔍 Тест топика: {topic_name}",
-                    "message_thread_id": thread_id
-                }
-                
-                response = requests.post(
-                    f"https://api.telegram.org/bot{Config.telegram_bot_token}/sendMessage",
-                    data=test_params,
-                    timeout=10
-                )
-                
-                if response.status_code == 200:
-                    message += f"✅ {topic_name} (ID: {thread_id})\n"
-                elif response.status_code == 400:
-                    message += f"❌ {topic_name} (ID: {thread_id}) - недоступен\n"
-                else:
-                    message += f"⚠️ {topic_name} (ID: {thread_id}) - ошибка {response.status_code}\n"
-                    
-            except Exception as e:
-                message += f"❌ {topic_name} (ID: {thread_id}) - ошибка: {str(e)[:30]}\n"
-        else:
+        if not thread_id:
             message += f"⚠️ {topic_name} - нет thread_id\n"
+            continue
+        state = topic_availability.get(thread_id, count_hit=thread_id not in to_probe)
+        if state is None:
+            message += f"⚠️ {topic_name} (ID: {thread_id}) - не удалось проверить\n"
+            continue
+        available, reason, age = state
+        cached = f" · {age/60:.0f} мин назад" if thread_id not in to_probe else ""
+        if available:
+            message += f"✅ {topic_name} (ID: {thread_id}){cached}\n"
+        else:
+            message += f"❌ {topic_name} (ID: {thread_id}) - недоступен ({reason}){cached}\n"
+    
+    stats = topic_availability.get_stats()
+    message += f"\n🔍 Проверено сейчас: {len(to_probe)}, из кэша: {len(set(t for t in thread_ids if t)) - len(to_probe)}"
+    message += f" (TTL {stats['ttl']/60:.0f} мин)\n"
     
     message += f"\n💡 РЕКОМЕНДАЦИИ:\n"
     message += f"• Если топики недоступны, вещи будут отправляться в основной чат\n"
@@ -1553,7 +1829,8 @@ async def detect_threadid_command(update: Update, context: ContextTypes.DEFAULT_
         await telegram_antiblock.safe_send_message(update.effective_chat.id, f"❌ Ошибка: {str(e)}")
 
 async def setup_bot():
-    application = Application.builder().token(Config.telegram_bot_token).build()
+    application = Application.builder().token(Config.telegram_bot_token).concurrent_updates(True).build()
+    telegram_antiblock.bot = application.bot
     
     # Основные команды (10)
     application.add_handler(CommandHandler("status", status_command))
@@ -1574,6 +1851,28 @@ async def setup_bot():
     
     return application
 
+async def start_webhook(application):
+    """Webhook вместо long polling: встроенный HTTP-сервер и setWebhook с secret token.
+    При ошибке возвращает None - бот работает через polling"""
+    path = getattr(Config, "telegram_webhook_path", "/telegram")
+    port = getattr(Config, "telegram_webhook_port", None) or int(os.environ.get("PORT", 8443))
+    # Без заданного секрета - случайный на каждый запуск (setWebhook вызывается при каждом старте)
+    secret = getattr(Config, "telegram_webhook_secret", "") or secrets.token_urlsafe(32)
+    receiver = WebhookReceiver(application, asyncio.get_running_loop(), port=port, path=path, secret_token=secret)
+    try:
+        receiver.start()
+        await application.bot.set_webhook(
+            url=Config.telegram_webhook_url.rstrip("/") + path,
+            secret_token=secret,
+            drop_pending_updates=True,
+        )
+    except Exception as e:
+        logging.error(f"❌ Webhook не запущен ({str(e)[:60]}), используется polling")
+        receiver.stop()
+        return None
+    logging.info(f"🪝 Webhook зарегистрирован: {Config.telegram_webhook_url.rstrip('/')}{path}")
+    return receiver
+
 def auto_recovery_system():
     """Автоматическая система самовосстановления"""
     global current_system, basic_system_errors, advanced_no_proxy_errors, advanced_proxy_errors, last_switch_time
@@ -1641,10 +1940,19 @@ def auto_recovery_system():
         
         last_switch_time = time.time()
 
+def flush_storage():
+    """Сброс буферов записи просмотренных ID и отметок топиков на диск"""
+    try:
+        seen_items.flush()
+        topic_watermarks.save()
+    except Exception as e:
+        logging.error(f"❌ Ошибка сброса хранилища: {e}")
+
 def signal_handler(signum, frame):
     global bot_running
     logging.info("🛑 Получен сигнал завершения, останавливаю систему...")
     bot_running = False
+    flush_storage()
 
 def main():
     global bot_running, scanner_thread
@@ -1653,6 +1961,7 @@ def main():
     signal.signal(signal.SIGTERM, signal_handler)
     
     load_analyzed_item()
+    start_notifications()
     
     logging.info("🚀 SUPERFAST Vinted Scanner with Priority Topics & Telegram AntiBlock!")
     
@@ -1664,15 +1973,22 @@ def main():
     if Config.telegram_bot_token and Config.telegram_chat_id:
         try:
             async def run_bot():
+                global webhook_receiver
                 application = await setup_bot()
                 await application.initialize()
                 await application.start()
-                await application.updater.start_polling(drop_pending_updates=True)
+                if getattr(Config, "telegram_webhook_url", ""):
+                    webhook_receiver = await start_webhook(application)
+                if webhook_receiver is None:
+                    await application.updater.start_polling(drop_pending_updates=True)
                 
                 while bot_running:
                     await asyncio.sleep(1)
                     
-                await application.updater.stop()
+                if webhook_receiver is not None:
+                    webhook_receiver.stop()
+                else:
+                    await application.updater.stop()
                 await application.stop()
                 await application.shutdown()
             
@@ -1693,6 +2009,15 @@ def main():
                 time.sleep(1)
         except KeyboardInterrupt:
             pass
+    
+    notifier.close()
+    if notification_outbox:
+        notification_outbox.close()
+    smtp_client.close()
+    flush_storage()
+    seen_items.close()
+    item_store.close()
+    http_client.close()
 
 if __name__ == "__main__":
     main()
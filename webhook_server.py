@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Прием обновлений Telegram через webhook
+Встроенный HTTP-сервер (stdlib) принимает обновления, которые Telegram отправляет сам, проверяет
+X-Telegram-Bot-Api-Secret-Token и передает их в очередь обновлений приложения - без long polling
+и без конфликтов getUpdates
+"""
+
+import asyncio
+import hmac
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from telegram import Update
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+# Telegram не присылает обновления больше нескольких мегабайт
+MAX_BODY = 1024 * 1024
+
+
+class WebhookReceiver:
+    """HTTP-сервер webhook: POST path -> application.update_queue"""
+
+    def __init__(self, application, loop: asyncio.AbstractEventLoop, listen: str = "0.0.0.0",
+                 port: int = 8443, path: str = "/telegram", secret_token: str = ""):
+        self.application = application
+        self.loop = loop
+        self.listen = listen
+        self.port = port
+        self.path = path
+        self.secret_token = secret_token
+        self._server = None
+        self._thread = None
+        # Запросы обрабатываются в нескольких потоках сервера
+        self._stats_lock = threading.Lock()
+
+        # Статистика
+        self.received = 0
+        self.rejected = 0
+        self.errors = 0
+        self.last_update_at = 0.0
+
+    def start(self):
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                receiver._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.listen, self.port), Handler)
+        self._server.daemon_threads = True
+        # Порт 0 - свободный порт (фактический виден в self.port)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True, name="tg-webhook")
+        self._thread.start()
+        logging.info(f"🪝 Webhook сервер слушает {self.listen}:{self.port}{self.path}")
+
+    def _handle(self, request: BaseHTTPRequestHandler):
+        if request.path.split("?", 1)[0] != self.path:
+            self._reply(request, 404)
+            return
+        if self.secret_token and not hmac.compare_digest(
+                request.headers.get(SECRET_HEADER, ""), self.secret_token):
+            with self._stats_lock:
+                self.rejected += 1
+            logging.warning(f"⚠️ Webhook: неверный secret token от {request.client_address[0]}")
+            self._reply(request, 403)
+            return
+        try:
+            length = int(request.headers.get("Content-Length", 0))
+            if length <= 0 or length > MAX_BODY:
+                raise ValueError(f"размер тела {length}")
+            data = json.loads(request.rfile.read(length))
+            update = Update.de_json(data, self.application.bot)
+        except Exception as e:
+            with self._stats_lock:
+                self.errors += 1
+            logging.warning(f"⚠️ Webhook: некорректное обновление: {str(e)[:60]}")
+            self._reply(request, 400)
+            return
+        # Ответ Telegram сразу; обработка идет в цикле событий бота
+        asyncio.run_coroutine_threadsafe(self.application.update_queue.put(update), self.loop)
+        with self._stats_lock:
+            self.received += 1
+            self.last_update_at = time.time()
+        self._reply(request, 200)
+
+    @staticmethod
+    def _reply(request: BaseHTTPRequestHandler, status: int):
+        request.send_response(status)
+        request.send_header("Content-Length", "0")
+        request.end_headers()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def get_stats(self):
+        with self._stats_lock:
+            return {
+                'received': self.received,
+                'rejected': self.rejected,
+                'errors': self.errors,
+                'last_update_ago': time.time() - self.last_update_at if self.last_update_at else None,
+            }